@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from client_cache import ClientCache
+from extractors import get_job_id
+from metrics import METRICS
+from seen_jobs import SeenJobIndex
+from upwork import UpworkBot
+
+"""
+    Batch mode: crawl many job searches with a single login.
+
+    The searches are read from a file with one search per line: the search link, optionally followed by a JSON object
+    of the REQUIREMENTS that are different for this search. Blank lines and lines starting with # are skipped:
+
+        https://www.upwork.com/nx/search/jobs/?q=python
+        https://www.upwork.com/nx/search/jobs/?q=scraping {"min_hire_rate": 70, "min_amount_spent": 1000}
+
+    The searches are crawled at the same time. A job found by several searches has its detail page loaded only once,
+    and is evaluated against the requirements of each search. Each search gets its own job store and matched jobs files
+    in a search_N directory of the output directory.
+"""
+
+BATCH_SUMMARY_FILE = "summary.json"
+
+
+def read_searches(path: str) -> list:
+    """
+        :return: List of (search link, requirements overrides) read from a searches file
+    """
+    searches = []
+    with open(path) as fp:
+        for line in fp:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            search_url, _, overrides = line.partition(" ")
+            searches.append((search_url, json.loads(overrides) if overrides.strip() else {}))
+    return searches
+
+
+class SharedJobFields:
+    """
+        Job fields of the job detail pages loaded by the searches of a batch, so that each page is loaded once.
+        It can be shared by several threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fields = {}  # Job id -> job fields
+        self.loading = {}  # Job id -> Event set once the search loading the job is done
+
+    def get(self, job_link: str, load):
+        """
+            :param load: Function that loads the job fields, called if no other search has loaded them or is loading
+            them
+            :return: The job fields, or None if the page did not load
+        """
+        job_id = get_job_id(job_link)
+        with self.lock:
+            if job_id in self.fields:
+                METRICS.increment("batch_shared_jobs")
+                return self.fields[job_id]
+            loading = self.loading.get(job_id)
+            if loading is None:
+                loading = self.loading[job_id] = threading.Event()
+                loader = True
+            else:
+                loader = False
+
+        if not loader:
+            loading.wait()
+            with self.lock:
+                if job_id in self.fields:
+                    METRICS.increment("batch_shared_jobs")
+                    return self.fields[job_id]
+            return None  # Retried by the search like any page that did not load
+
+        job_fields = None
+        try:
+            job_fields = load()
+        finally:
+            with self.lock:
+                if job_fields is not None:
+                    self.fields[job_id] = job_fields
+                del self.loading[job_id]
+            loading.set()
+        return job_fields
+
+
+class BatchSearchBot(UpworkBot):
+    """
+        Bot crawling one search of a batch, sharing the job detail pages it loads with the other searches
+    """
+
+    def __init__(self, *args, shared_jobs: SharedJobFields, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shared_jobs = shared_jobs
+
+    def select_job_links(self, page_jobs_tiles: list) -> list:
+        """
+            Get the full links of the jobs whose tile meets the requirements. The jobs evaluated recently are kept:
+            they are evaluated again against the requirements of this search from their saved fields.
+        """
+        job_links = []
+        for each in page_jobs_tiles:
+            if self.tile_meets_requirements(each):
+                self.remember_tile_client(self.base_url + each['job_link'], each)
+                job_links.append(self.base_url + each['job_link'])
+            else:
+                self.record_prefiltered_job(self.base_url + each['job_link'], each)
+        return job_links
+
+    def load_job_fields(self, job_link: str):
+        """
+            :return: The fields of the job, from its recent evaluation or else from its detail page, or None if the page
+            did not load
+        """
+        seen_job = self.seen_jobs.get(job_link)
+        if seen_job is not None:
+            return {key: value for key, value in seen_job.items()
+                    if key not in ("match", "job_link", "posted_at")}
+        if self.fetch_mode == "browser":
+            self.driver.get(job_link)
+        detail_page_html = self.retrieve_job_details(job_link)
+        if detail_page_html is None:
+            return None
+        return self.extraction_engine.extract(detail_page_html)
+
+    def load_job_details(self, job_link: str):
+        job_fields = self.shared_jobs.get(job_link, lambda: self.load_job_fields(job_link))
+        if job_fields is None:
+            return None
+        return self.get_job_details(job_link, job_fields)
+
+
+class BatchCrawl:
+    def __init__(self, searches: list, output_dir: str = "batch_results", concurrency: int = 4):
+        """
+        :param searches: List of (search link, requirements overrides)
+        :param output_dir: Directory of the results of every search
+        :param concurrency: Maximum number of searches crawled at the same time
+        """
+        self.searches = searches
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+
+    def crawl(self, bot: UpworkBot, no_of_jobs: int, driver_pool=None) -> list:
+        """
+            Crawl every search with the session of the bot, until no_of_jobs matching jobs or the last page of each
+            search
+            :param bot: Logged-in UpworkBot whose settings and requirements are used for every search
+            :param driver_pool: Started DriverPool whose browsers crawl the searches in the "browser" fetch mode,
+            without it the searches are crawled one at a time by the bot's browser
+            :return: The bot of each search
+        """
+        for _, overrides in self.searches:
+            unknown = set(overrides) - set(bot.requirements)
+            if unknown:
+                raise ValueError("Unknown requirements: {0}".format(", ".join(sorted(unknown))))
+
+        shared_jobs = SharedJobFields()
+        client_cache = ClientCache(bot.client_cache_file, bot.client_cache_ttl, bot.client_cache_size)
+        drivers = None
+        concurrency = self.concurrency
+        if bot.fetch_mode == "browser":
+            drivers = queue.Queue()
+            for worker in driver_pool.workers if driver_pool is not None else [bot]:
+                drivers.put(worker.driver)
+            concurrency = min(concurrency, drivers.qsize())
+
+        def crawl_search(search_no: int, search_url: str, overrides: dict) -> BatchSearchBot:
+            directory = os.path.join(self.output_dir, "search_{0}".format(search_no))
+            os.makedirs(directory, exist_ok=True)
+            driver = drivers.get() if drivers is not None else None
+            search_bot = BatchSearchBot(
+                search_url, dict(bot.requirements, **overrides), bot.timeout, bot.need_json_format, driver=driver,
+                navigate_by_url=True, extraction_engine=bot.extraction_engine.name,
+                results_file=os.path.join(directory, "evaluated_jobs.jsonl"), seen_jobs_file=bot.seen_jobs_file,
+                seen_job_ttl=bot.seen_job_ttl, lean_browser=bot.lean_browser, fetch_mode=bot.fetch_mode,
+                http_fetcher=bot.http_fetcher, base_url=bot.base_url,
+                matched_jobs_txt=os.path.join(directory, "matched_jobs.txt"),
+                matched_jobs_json=os.path.join(directory, "matched_jobs.json"), wait_timeouts=bot.wait_timeouts,
+                shared_jobs=shared_jobs)
+            search_bot.seen_jobs = SeenJobIndex(bot.seen_jobs_file, bot.seen_job_ttl)  # One connection per thread
+            search_bot.client_cache = client_cache
+            print("Search {0}: {1}".format(search_no, search_url))
+            try:
+                search_bot.crawl_search_pages(no_of_jobs)
+            finally:
+                search_bot.seen_jobs.close()
+                search_bot.job_store.close()
+                search_bot.save_job_results(no_of_jobs)
+                if driver is not None:
+                    drivers.put(driver)
+            return search_bot
+
+        try:
+            with ThreadPoolExecutor(concurrency) as executor:
+                futures = [executor.submit(crawl_search, search_no, search_url, overrides)
+                           for search_no, (search_url, overrides) in enumerate(self.searches, start=1)]
+                search_bots = [future.result() for future in futures]
+        finally:
+            client_cache.close()
+        self.save_summary(search_bots)
+        return search_bots
+
+    def save_summary(self, search_bots: list):
+        summary = [{"search_url": search_bot.search_url, "requirements": search_bot.requirements,
+                    "matched_jobs": len(search_bot.matched_job_links), "saved_jobs": len(search_bot.exported_jobs),
+                    "matched_jobs_txt": search_bot.matched_jobs_txt}
+                   for search_bot in search_bots]
+        with open(os.path.join(self.output_dir, BATCH_SUMMARY_FILE), mode="w") as fp:
+            json.dump(summary, fp, indent=4)
+            fp.write('\n')
+        print("\n\nBatch completed!!")
+        for search_no, search_bot in enumerate(search_bots, start=1):
+            print("Search {0}: {1} matched jobs found, {2} saved to {3}".format(
+                search_no, len(search_bot.matched_job_links), len(search_bot.exported_jobs),
+                search_bot.matched_jobs_txt))
+        print("Job detail pages shared between searches: {0}".format(
+            METRICS.summary()["counters"].get("batch_shared_jobs", 0)))
+
+
+if __name__ == "__main__":
+    from driver_pool import DriverPool
+    from http_fetch import HttpFetcher
+    from main import REQUIREMENTS, MAXIMUM_MATCH_JOBS, TIMEOUT_AFTER, NEED_JSON_FORMAT, EXTRACTION_ENGINE, \
+        SEEN_JOBS_FILE, SEEN_JOB_TTL, CLIENT_CACHE_FILE, CLIENT_CACHE_TTL, CLIENT_CACHE_SIZE, LEAN_BROWSER, \
+        FETCH_MODE, HTTP_MAX_CONNECTIONS, HTTP2, SESSION_FILE, METRICS_FILE, WAIT_TIMEOUTS, login
+
+    parser = argparse.ArgumentParser(description="Crawl several Upwork job searches with one login")
+    parser.add_argument("searches", help="File of search links, each optionally followed by JSON requirements")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of searches crawled at the same time")
+    parser.add_argument("--output-dir", default="batch_results", help="Directory of the results of each search")
+    parser.add_argument("--max-matches", type=int, default=MAXIMUM_MATCH_JOBS,
+                        help="Number of matching jobs to find in each search")
+    args = parser.parse_args()
+
+    batch_searches = read_searches(args.searches)
+    scrap_bot = UpworkBot(search_url=batch_searches[0][0], requirements=REQUIREMENTS, timeout=TIMEOUT_AFTER,
+                          need_json_format=NEED_JSON_FORMAT, navigate_by_url=True, extraction_engine=EXTRACTION_ENGINE,
+                          seen_jobs_file=SEEN_JOBS_FILE, seen_job_ttl=SEEN_JOB_TTL, lean_browser=LEAN_BROWSER,
+                          fetch_mode=FETCH_MODE, client_cache_file=CLIENT_CACHE_FILE,
+                          client_cache_ttl=CLIENT_CACHE_TTL, client_cache_size=CLIENT_CACHE_SIZE,
+                          wait_timeouts=WAIT_TIMEOUTS)
+    if not login(scrap_bot):
+        print("Login Failed!!")
+        raise SystemExit
+    print("Login Successful!!\n")
+
+    batch_driver_pool = None
+    if FETCH_MODE == "http":
+        scrap_bot.http_fetcher = HttpFetcher.from_driver(scrap_bot.driver, max_connections=HTTP_MAX_CONNECTIONS,
+                                                         http2=HTTP2, timeout=TIMEOUT_AFTER)
+    elif args.concurrency > 1:
+        batch_driver_pool = DriverPool(scrap_bot, args.concurrency, SESSION_FILE)
+        batch_driver_pool.start()
+    try:
+        BatchCrawl(batch_searches, args.output_dir, args.concurrency).crawl(scrap_bot, args.max_matches,
+                                                                            batch_driver_pool)
+    finally:
+        METRICS.save_json(METRICS_FILE)
+        if batch_driver_pool is not None:
+            batch_driver_pool.close()
+        if scrap_bot.http_fetcher is not None:
+            scrap_bot.http_fetcher.close()
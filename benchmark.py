@@ -0,0 +1,195 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import extractors
+
+"""
+    Offline benchmark of the job extractors against the saved Upwork pages in fixtures/
+
+    Run benchmark.py to print the time taken by each extractor, by a whole job detail page and by a search result page.
+    Run benchmark.py --check to also compare the extracted job fields against fixtures/baseline.json. The script exits
+    with an error if they differ, or if the pages got slower than --max-slowdown times the baseline timings.
+    Run benchmark.py --update-baseline after an intended change of the extracted fields to store the new baseline.
+    An engine with a browser script (--engine browser) is given the saved outputs of its script in fixtures/browser/ in
+    place of the detail pages they were read from. A page without one (the script returns nothing until the page has
+    loaded) is given as it is.
+"""
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BASELINE_FILE = os.path.join(FIXTURES_DIR, "baseline.json")
+# Job fields the outputs of the browser script do not have, left out of the comparison with the baseline
+SCRIPT_UNREAD_FIELDS = ("client_id",)
+
+
+def load_fixtures(kind: str, extension: str = ".html") -> dict:
+    """
+        Read the saved pages of a kind ("detail" or "search"), or the saved outputs of the browser script ("browser")
+        :return: dict of fixture name -> html page or script output
+    """
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, kind, "*" + extension))):
+        with open(path, encoding="utf-8") as fp:
+            pages[os.path.splitext(os.path.basename(path))[0]] = fp.read()
+    return pages
+
+
+def time_call(function, args: tuple, iterations: int) -> float:
+    """
+        :return: Average number of seconds taken by one call of the function
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(*args)
+    return (time.perf_counter() - start) / iterations
+
+
+def extract_all(engine, detail_pages: dict, search_pages: dict) -> dict:
+    return {
+        "detail": {name: engine.extract(html) for name, html in detail_pages.items()},
+        "search": {name: extractors.get_job_links(html) for name, html in search_pages.items()},
+    }
+
+
+def benchmark_extractors(detail_pages: dict, iterations: int) -> dict:
+    """
+        Time each extractor on every loaded detail page.
+        :return: dict of extractor name -> average seconds per call
+    """
+    calls = {}
+    for html in detail_pages.values():
+        soup = extractors.parse_html(html)
+        activities = extractors.get_job_and_client_activity(soup)
+        if activities is None:
+            continue
+        job_activity, client_activity = activities['job_activity'], activities['client_activity']
+        hired_count = extractors.get_total_hire_count(client_activity)
+        for name, function, args in [
+            ("parse_html", extractors.parse_html, (html,)),
+            ("get_job_and_client_activity", extractors.get_job_and_client_activity, (soup,)),
+            ("get_no_of_interviewing_and_invites", extractors.get_no_of_interviewing_and_invites, (job_activity,)),
+            ("get_proposal_count", extractors.get_proposal_count, (job_activity,)),
+            ("get_no_hires", extractors.get_no_hires, (job_activity,)),
+            ("get_total_hire_count", extractors.get_total_hire_count, (client_activity,)),
+            ("get_hire_rate", extractors.get_hire_rate, (soup, client_activity, hired_count)),
+            ("get_employer_ratings", extractors.get_employer_ratings, (client_activity,)),
+            ("get_total_amount_spent", extractors.get_total_amount_spent, (client_activity,)),
+            ("get_payment_verification", extractors.get_payment_verification, (client_activity,)),
+        ]:
+            calls.setdefault(name, []).append(time_call(function, args, iterations))
+    return {name: sum(timings) / len(timings) for name, timings in calls.items()}
+
+
+def benchmark_pages(engine, detail_pages: dict, search_pages: dict, iterations: int) -> dict:
+    """
+        Time the extraction of whole pages.
+        :return: dict of "detail_page" and "search_page" -> average seconds per page
+    """
+    detail_timings = [time_call(engine.extract, (html,), iterations) for html in detail_pages.values()]
+    search_timings = [time_call(extractors.get_job_links, (html,), iterations) for html in search_pages.values()]
+    return {
+        "detail_page": sum(detail_timings) / len(detail_timings),
+        "search_page": sum(search_timings) / len(search_timings),
+    }
+
+
+def without_fields(job_fields, fields: tuple):
+    if not isinstance(job_fields, dict):
+        return job_fields
+    return {key: value for key, value in job_fields.items() if key not in fields}
+
+
+def compare_with_baseline(results: dict, page_timings: dict, baseline: dict, max_slowdown=None,
+                          unread_fields: tuple = ()) -> list:
+    """
+        :param unread_fields: Job fields of the detail pages left out of the comparison
+        :return: List of the differences between this run and the baseline
+    """
+    differences = []
+    for kind in ("detail", "search"):
+        for name in sorted(set(results[kind]) | set(baseline["results"][kind])):
+            expected = baseline["results"][kind].get(name)
+            found = results[kind].get(name)
+            if kind == "detail":
+                expected, found = without_fields(expected, unread_fields), without_fields(found, unread_fields)
+            if found != expected:
+                differences.append("{0}/{1}: expected {2}, found {3}".format(kind, name, expected, found))
+    if max_slowdown is not None:
+        for name, seconds in page_timings.items():
+            limit = baseline["timings"][name] * max_slowdown
+            if seconds > limit:
+                differences.append("{0}: {1:.1f} µs per page is slower than the {2:.1f} µs allowed".format(
+                    name, seconds * 1e6, limit * 1e6))
+    return differences
+
+
+def print_timings(title: str, timings: dict):
+    print(title)
+    for name, seconds in timings.items():
+        print("    {0:<40} {1:>10.1f} µs {2:>12.0f} records/sec".format(name, seconds * 1e6, 1 / seconds))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the job extractors on the saved Upwork pages")
+    parser.add_argument("--iterations", type=int, default=100, help="Number of times each call is timed")
+    parser.add_argument("--engine", default="soup", choices=sorted(extractors.EXTRACTION_ENGINES),
+                        help="Extraction engine used for the whole detail pages")
+    parser.add_argument("--check", action="store_true", help="Compare the results against the stored baseline")
+    parser.add_argument("--max-slowdown", type=float, default=None,
+                        help="With --check, fail if a page is this many times slower than the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--report", default=None, help="Write the timings and results of this run to a JSON file")
+    args = parser.parse_args()
+
+    engine = extractors.EXTRACTION_ENGINES[args.engine]()
+    if args.update_baseline and engine.script is not None:
+        parser.error("the baseline is stored from the detail pages, not from the outputs of the {0} engine's script"
+                     .format(engine.name))
+    detail_pages = load_fixtures("detail")
+    search_pages = load_fixtures("search")
+    engine_pages = detail_pages
+    unread_fields = ()
+    if engine.script is not None:
+        engine_pages = dict(detail_pages, **load_fixtures("browser", ".json"))
+        unread_fields = SCRIPT_UNREAD_FIELDS
+
+    results = extract_all(engine, engine_pages, search_pages)
+    extractor_timings = benchmark_extractors(detail_pages, args.iterations)
+    page_timings = benchmark_pages(engine, engine_pages, search_pages, args.iterations)
+
+    print("Parser: {0}, engine: {1}, {2} detail pages, {3} search pages\n".format(
+        extractors.HTML_PARSER, engine.name, len(detail_pages), len(search_pages)))
+    print_timings("Extractors", extractor_timings)
+    print_timings("Whole pages", page_timings)
+
+    report = {"parser": extractors.HTML_PARSER, "engine": engine.name, "results": results,
+              "timings": page_timings, "extractor_timings": extractor_timings}
+    if args.report is not None:
+        with open(args.report, mode="w") as fp:
+            json.dump(report, fp, indent=4)
+            fp.write('\n')
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, mode="w") as fp:
+            json.dump({"results": results, "timings": page_timings}, fp, indent=4)
+            fp.write('\n')
+        print("Baseline has been saved to {0}".format(BASELINE_FILE))
+
+    elif args.check:
+        with open(BASELINE_FILE) as fp:
+            baseline = json.load(fp)
+        differences = compare_with_baseline(results, page_timings, baseline, args.max_slowdown, unread_fields)
+        if differences:
+            print("Results differ from the baseline:")
+            for each in differences:
+                print("    " + each)
+            sys.exit(1)
+        print("Results match the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from extractors import CLIENT_FIELDS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+"""
+    On-disk cache of the client statistics read from the job detail pages, so that the jobs of a client already known
+    to fail the requirements are rejected without reading the rest of their page
+"""
+
+
+class ClientCache:
+    """
+        Least recently used cache of client profiles, keyed by the client id of extractors.get_client_id.
+
+        A profile is fresh for ttl seconds. The cache keeps at most max_size clients and is saved to a JSON file when
+        closed. It can be shared by several threads.
+    """
+
+    def __init__(self, path: str, ttl: float, max_size: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.profiles = OrderedDict(self.read_file())  # Least recently used first
+        self.evict()
+
+    def read_file(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as fp:
+                return json.load(fp)
+        except json.JSONDecodeError:
+            return {}
+
+    def evict(self):
+        now = time.time()
+        for client_id in [client_id for client_id, profile in self.profiles.items()
+                          if now - profile['cached_at'] > self.ttl]:
+            del self.profiles[client_id]
+        while len(self.profiles) > self.max_size:
+            self.profiles.popitem(last=False)
+
+    def get(self, client_id: str):
+        """
+            :return: The fresh profile of the client, or None if it is not cached
+        """
+        with self.lock:
+            profile = self.profiles.get(client_id)
+            if profile is None:
+                return None
+            if time.time() - profile['cached_at'] > self.ttl:
+                del self.profiles[client_id]
+                return None
+            self.profiles.move_to_end(client_id)
+            return profile
+
+    def add(self, job_details: dict):
+        """
+            Save the client fields of an evaluated job as the profile of its client
+        """
+        if job_details.get('client_id') is None:
+            return
+        profile = {field: job_details[field] for field in CLIENT_FIELDS}
+        profile['cached_at'] = time.time()
+        with self.lock:
+            self.profiles[job_details['client_id']] = profile
+            self.profiles.move_to_end(job_details['client_id'])
+            while len(self.profiles) > self.max_size:
+                self.profiles.popitem(last=False)
+
+    def close(self):
+        """
+            Save the cache, keeping the newer profiles saved meanwhile by other processes.
+            The processes closing their cache at the same time save it one after the other where the file can be
+            locked (not on Windows, where the last one to save it wins).
+        """
+        with self.lock, open(self.path + ".lock", mode="a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            for client_id, profile in self.read_file().items():
+                if client_id not in self.profiles or self.profiles[client_id]['cached_at'] < profile['cached_at']:
+                    self.profiles[client_id] = profile
+            self.evict()
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            try:
+                with os.fdopen(fd, mode="w", encoding="utf-8") as fp:
+                    json.dump(self.profiles, fp)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
@@ -0,0 +1,106 @@
+import threading
+
+from retry import RetryQueue
+from session_cache import load_session
+from upwork import UpworkBot, create_driver, copy_session_cookies, UPWORK_BASE_URL
+
+ERROR = "error"  # Key of the results under which a session puts the exception that stopped the pool
+
+
+class DriverPool:
+    """
+        A pool of logged-in browser sessions that evaluate job detail pages at the same time.
+
+        Every session runs in its own thread and takes job links from a shared queue.
+        The sessions are logged in by loading the saved session file, or else by copying the cookies of the bot's own
+        (already logged-in) browser.
+    """
+
+    def __init__(self, bot: UpworkBot, size: int, session_file: str = None):
+        self.bot = bot
+        self.size = size
+        self.session_file = session_file
+        self.workers = []
+
+    def start(self):
+        """
+            Start the browser sessions of the pool and log each of them in
+        """
+        print("Starting {0} browser sessions ...".format(self.size))
+        for _ in range(self.size):
+            driver = create_driver(self.bot.lean_browser)
+            if not load_session(driver, self.session_file, UPWORK_BASE_URL):
+                copy_session_cookies(self.bot.driver, driver)
+            self.workers.append(UpworkBot(self.bot.search_url, self.bot.requirements, self.bot.timeout,
+                                          self.bot.need_json_format, driver=driver,
+                                          extraction_engine=self.bot.extraction_engine.name,
+                                          lean_browser=self.bot.lean_browser, wait_timeouts=self.bot.wait_timeouts))
+
+    def close(self):
+        for worker in self.workers:
+            worker.driver.quit()
+        self.workers = []
+
+    @staticmethod
+    def _work(worker: UpworkBot, jobs: RetryQueue, results: dict, condition: threading.Condition):
+        while True:
+            next_job = jobs.get()
+            if next_job is None:
+                return
+            (index, job_link), trial = next_job
+            try:
+                worker.driver.get(job_link)
+                job_details = worker.get_job_required_details(job_link)
+            except Exception as exc:  # Handed back to the caller, the jobs still queued or being tried get no result
+                with condition:
+                    results.setdefault(ERROR, exc)
+                    condition.notify_all()
+                jobs.stop()
+                return
+            # A job whose page did not load goes back in the queue and the session moves on to the next job
+            if jobs.done((index, job_link), trial, job_details is not None):
+                with condition:
+                    results[index] = job_details  # None once the job has been given up
+                    condition.notify_all()
+
+    def evaluate(self, job_links: list, max_matches: int) -> list:
+        """
+            Evaluate the given job links on all the sessions of the pool.
+
+            :param job_links: Links to the job detail pages
+            :param max_matches: All the sessions stop as soon as this number of matching jobs has been found
+            :return: List of the job details, in the same order as the job links, without the jobs whose page did not
+            load after MAX_REQUEST_TRIAL trials
+        """
+        jobs = self.bot.create_retry_queue(job_links)
+        for worker in self.workers:
+            worker.client_cache = self.bot.client_cache
+            worker.tile_client_ids = self.bot.tile_client_ids
+        results = {}
+        condition = threading.Condition()
+        threads = [threading.Thread(target=self._work, args=(worker, jobs, results, condition), daemon=True)
+                   for worker in self.workers]
+        for thread in threads:
+            thread.start()
+
+        all_details = []
+        no_of_matches = 0
+        try:
+            for index in range(len(job_links)):
+                if no_of_matches >= max_matches:
+                    break
+                with condition:
+                    condition.wait_for(lambda: index in results or ERROR in results)
+                    if ERROR in results:
+                        raise results[ERROR]
+                    job_details = results[index]
+                if job_details is None:
+                    continue
+                all_details.append(job_details)
+                if job_details['match']:
+                    no_of_matches += 1
+        finally:
+            jobs.stop()
+            for thread in threads:
+                thread.join()
+        return all_details
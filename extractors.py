@@ -0,0 +1,716 @@
+import json
+import math
+import re
+import time
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from metrics import METRICS
+
+"""
+    Extraction of the job fields from Upwork search result and job detail pages.
+
+    Every page is parsed once, with the fastest parser available (lxml, falling back to html.parser),
+    and all the CSS selectors are compiled once when this module is imported.
+    The StateEngine reads the job fields from the JSON state embedded in the job detail page instead, without parsing
+    the markup, and the BrowserEngine reads the texts it needs in the browser and only receives them.
+"""
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+SELECTOR_CSS = {
+    "job_links": ".job-tile-title > a",
+    "job_details_loader": ".job-details-loader",
+    "job_name": "h1",
+    "job_activity": "div.col-12.cfe-ui-job-details-content > section.up-card-section.row > div.col-lg-6",
+    "job_activity_fallback": "section.up-card-section.row > div:nth-child(2)",
+    "client_activity": "div.cfe-ui-job-about-client",
+    "preferred_qualifications": "section.up-card-section.row > div:nth-child(1) > ul.list-unstyled",
+    "qualification_warning": "span.ml-5 > div.text-danger",
+    "activity_item_1": "div > ul > li:nth-child(1) > span:nth-child(2) > span:nth-child(3)",
+    "activity_item_2": "div > ul > li:nth-child(2)",
+    "activity_item_3": "div > ul > li:nth-child(3)",
+    "activity_item_4": "div > ul > li:nth-child(4)",
+    "activity_item_5": "div > ul > li:nth-child(5)",
+    "activity_list": "div > ul",
+    "client_hires": "div > ul > li:nth-child(3) > div",
+    "client_hire_rate": "section.up-card-section.d-lg-none > div > ul > li:nth-child(2) > div",
+    "client_jobs_posted": "div > ul > li:nth-child(2) > strong",
+    "client_ratings": "div.text-muted.rating.mb-20 > span",
+    "client_total_spent": "div > ul > li:nth-child(3) > strong > span > span",
+    "enterprise_payment": "div.enterprise-payment.mb-10 > div > strong",
+    "payment_muted": "div.mb-10 > div > div > span.text-muted",
+    "payment_strong": "div.mb-10 > div > div > strong",
+    "tile_proposals": "[data-test=proposals] > strong",
+    "tile_payment": "[data-test=payment-verification-status] > strong",
+    "tile_spent": "[data-test=client-spendings] > strong",
+    "tile_rating": "[data-test=client-feedback] > .sr-only",
+    "tile_posted": "[data-test=UpCRelativeTime]",
+}
+SELECTORS = {name: soupsieve.compile(css) for name, css in SELECTOR_CSS.items()}
+
+
+JOB_ID_PATTERN = re.compile(r"~[0-9a-zA-Z]+")
+RELATIVE_TIME_PATTERN = re.compile(r"(\d+|an?|one)\s+(second|minute|hour|day|week|month|year)s?\s+ago")
+STATE_PATTERN = re.compile(r'<script[^>]*\bid="__NUXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+TIME_UNITS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60, "week": 7 * 24 * 60 * 60,
+              "month": 30 * 24 * 60 * 60, "year": 365 * 24 * 60 * 60}
+
+
+# Fields read from the "About the client" section, that are the same for every job of a client
+CLIENT_FIELDS = ("payment_verified", "total_spent", "ratings", "hire_rate")
+# Fields read from the activity on the job
+JOB_FIELDS = ("proposal_count", "exclamation_mark", "no_interviewing", "invites_count", "hired_count")
+
+
+# Where each job field is in the job details object of the embedded page state
+STATE_PATHS = {
+    "job_name": ("job", "title"),
+    "applicants": ("job", "clientActivity", "totalApplicants"),
+    "no_interviewing": ("job", "clientActivity", "totalInvitedToInterview"),
+    "invites_count": ("job", "clientActivity", "invitationsSent"),
+    "hired_count": ("job", "clientActivity", "totalHired"),
+    "payment_verified": ("buyer", "isPaymentMethodVerified"),
+    "total_spent": ("buyer", "stats", "totalCharges", "amount"),
+    "ratings": ("buyer", "stats", "score"),
+    "jobs_with_hires": ("buyer", "stats", "totalJobsWithHires"),
+    "jobs_posted": ("buyer", "jobs", "postedCount"),
+}
+# Optional fields of the page state
+STATE_OPTIONAL_PATHS = {
+    "company_id": ("buyer", "company", "companyId"),
+    "qualifications": ("qualificationsMatches", "matches"),
+}
+# Key of the job id (~01...) of the jobs of the state embedded in a search result page, and where the company id of
+# their client is in each job
+SEARCH_STATE_JOB_ID = "ciphertext"
+SEARCH_STATE_COMPANY_ID_PATH = ("client", "companyId")
+# Upper bound of each range of proposals shown on the job detail page
+PROPOSAL_RANGES = ((5, "Less than 5"), (10, "5 to 10"), (15, "10 to 15"), (20, "15 to 20"), (50, "20 to 50"))
+# Elements of the job detail page whose text the BrowserEngine reads
+BROWSER_JOB_TEXTS = ("activity_item_1", "activity_item_2", "activity_item_3", "activity_item_4", "activity_item_5")
+BROWSER_CLIENT_TEXTS = ("client_hires", "client_jobs_posted", "client_ratings", "client_total_spent",
+                        "enterprise_payment", "payment_muted", "payment_strong")
+# Run in the page with the SELECTOR_CSS and the names above as arguments. It reads the same elements as the
+# SoupEngine, with the text BeautifulSoup's get_text(strip=True) would give, and returns them as a JSON string, or
+# null while the page has not loaded them.
+BROWSER_EXTRACTION_SCRIPT = """
+var css = arguments[0], jobTexts = arguments[1], clientTexts = arguments[2];
+function getText(element) {
+    if (!element) return null;
+    var parts = [], walker = document.createTreeWalker(element, NodeFilter.SHOW_TEXT), node;
+    while ((node = walker.nextNode())) {
+        var part = node.nodeValue.trim();
+        if (part) parts.push(part);
+    }
+    return parts.join("");
+}
+function select(scope, name) {
+    return scope ? scope.querySelector(css[name]) : null;
+}
+function selectTexts(scope, names) {
+    var texts = {};
+    names.forEach(function (name) { texts[name] = getText(select(scope, name)); });
+    return texts;
+}
+var root = document.querySelector(css.job_details_loader) || document;
+var jobActivity = select(root, "job_activity"), clientActivity = select(root, "client_activity");
+if (!jobActivity || !clientActivity || !jobActivity.querySelector("h4")) return null;
+var exclamationMark = false;
+if (getText(jobActivity.querySelector("h4")) !== "Activity on this job") {
+    jobActivity = select(root, "job_activity_fallback");
+    var qualifications = select(root, "preferred_qualifications");
+    if (!qualifications) return null;
+    qualifications.querySelectorAll("li").forEach(function (item) {
+        if (item.querySelector(css.qualification_warning)) exclamationMark = true;
+    });
+}
+var activityList = select(jobActivity, "activity_list");
+return JSON.stringify({
+    "job_name": getText(select(root, "job_name")),
+    "exclamation_mark": exclamationMark,
+    "job": selectTexts(jobActivity, jobTexts),
+    "activity_list": activityList ? Array.prototype.map.call(activityList.querySelectorAll("li"), getText) : null,
+    "client": selectTexts(clientActivity, clientTexts),
+    "client_hire_rate": getText(select(root, "client_hire_rate"))
+});
+"""
+# Values of the negative indexes of a devalue payload: undefined, hole, NaN, Infinity, -Infinity and -0
+PAYLOAD_CONSTANTS = {-1: None, -2: None, -3: math.nan, -4: math.inf, -5: -math.inf, -6: -0.0}
+# Types of a devalue payload that only wrap a value
+PAYLOAD_WRAPPERS = {"Reactive", "ShallowReactive", "Ref", "ShallowRef", "EmptyRef", "EmptyShallowRef"}
+
+
+def parse_html(html_page: str) -> BeautifulSoup:
+    return BeautifulSoup(html_page, HTML_PARSER)
+
+
+def get_no_of_interviewing_and_invites(job_activity: BeautifulSoup):
+    try:
+        interviewing_no = int(
+            SELECTORS["activity_item_2"].select_one(job_activity).get_text(strip=True).strip("Interviewing:"))
+        invites_count = int(
+            SELECTORS["activity_item_3"].select_one(job_activity).get_text(strip=True).strip("Invites sent:"))
+    except ValueError:
+        try:
+            interviewing_no = int(
+                SELECTORS["activity_item_3"].select_one(job_activity).get_text(strip=True).strip("Interviewing:"))
+            invites_count = int(
+                SELECTORS["activity_item_4"].select_one(job_activity).get_text(strip=True).strip("Invites sent:"))
+        except ValueError:
+            try:
+                interviewing_no = int(
+                    SELECTORS["activity_item_4"].select_one(job_activity).get_text(strip=True).strip("Interviewing:"))
+                invites_count = int(
+                    SELECTORS["activity_item_5"].select_one(job_activity).get_text(strip=True).strip("Invites sent:"))
+            except AttributeError:
+                interviewing_no, invites_count = None, None  # Job is no longer available
+        except AttributeError:
+            interviewing_no, invites_count = None, None    #Job is no longer available
+    except AttributeError:
+        interviewing_no, invites_count = None, None  # Job is no longer available
+    return {"interviewing_no": interviewing_no, "invites_count": invites_count}
+
+
+def get_proposal_count(job_activity) -> str:
+    try:
+        proposal_count = SELECTORS["activity_item_1"].select_one(job_activity).get_text(strip=True)
+    except AttributeError:
+        proposal_count = None  # Job is no longer available
+
+    return proposal_count
+
+
+def get_total_hire_count(client_activity) -> int:
+    try:
+        hired_count = int(SELECTORS["client_hires"].select_one(client_activity).get_text(strip=True).split()[0])
+    except (AttributeError, ValueError):
+        hired_count = 0
+    return hired_count
+
+
+def get_hire_rate(soup, client_activity, hired_count):
+    try:
+        hire_rate = int(
+            SELECTORS["client_hire_rate"].select_one(soup).get_text(strip=True).split()[0].strip("%"))
+    except AttributeError:
+        job_post_str = SELECTORS["client_jobs_posted"].select_one(client_activity).get_text(strip=True).split()[0]
+        try:
+            employer_jobs_posted = int(job_post_str)
+        except ValueError:
+            employer_jobs_posted = int(job_post_str.replace(',', ''))
+
+        hire_rate = math.ceil(float(hired_count / employer_jobs_posted) * 100)
+
+    return hire_rate
+
+
+def get_employer_ratings(client_activity):
+
+    try:
+        ratings = float(SELECTORS["client_ratings"].select_one(client_activity).get_text(strip=True).split()[0])
+    except AttributeError:
+        ratings = 0
+
+    return ratings
+
+
+def get_no_hires(job_activity):
+    no_of_hires = 0
+    try:
+        for each in SELECTORS["activity_list"].select_one(job_activity).find_all("li"):
+            temp = each.get_text(strip=True).split(":")
+            if temp[0] == "Hires":
+                no_of_hires = int(temp[1])
+    except AttributeError:
+        pass
+    return no_of_hires
+
+
+def get_payment_verification(client_activity):
+
+    try:
+        payment_verified = (SELECTORS["enterprise_payment"].select_one(client_activity).get_text(
+            strip=True)) == "Payment method verified"
+    except AttributeError:
+        try:
+            payment_verified = (SELECTORS["payment_muted"].select_one(client_activity).get_text(
+                strip=True)) == "Payment method verified"
+        except AttributeError:
+            payment_verified = (SELECTORS["payment_strong"].select_one(client_activity).get_text(
+                strip=True)) == "Payment method verified"
+    return payment_verified
+
+
+def get_total_amount_spent(client_activity):
+    try:
+        total_spent = SELECTORS["client_total_spent"].select_one(client_activity).get_text(strip=True)
+    except (AttributeError, ValueError):
+        total_spent = "0"
+    return parse_total_spent(total_spent)
+
+
+def parse_total_spent(total_spent: str):
+    total_spent = total_spent.strip('$')
+    if 'K' in total_spent:
+        total_spent = float(total_spent.strip('K')) * 1000
+    elif "M" in total_spent:
+        total_spent = float(total_spent.strip("M")) * 1000000
+    else:
+        total_spent = int(total_spent)
+    return total_spent
+
+
+def get_job_links(html_page: str) -> list:
+    return [each.get("href") for each in SELECTORS["job_links"].select(parse_html(html_page))]
+
+
+def get_tile_total_spent(tile):
+    """
+        :return: The client total spent shown on a search result tile, and False if it is only a lower bound ($10K+)
+    """
+    total_spent = SELECTORS["tile_spent"].select_one(tile).get_text(strip=True).strip('$')
+    exact = not total_spent.endswith('+')
+    total_spent = total_spent.strip('+')
+    if 'K' in total_spent:
+        total_spent = float(total_spent.strip('K')) * 1000
+    elif "M" in total_spent:
+        total_spent = float(total_spent.strip("M")) * 1000000
+    else:
+        total_spent = int(total_spent.replace(',', ''))
+    return total_spent, exact
+
+
+def parse_posted_time(relative_time: str, now: float):
+    """
+        Estimate when a job was posted from the relative time shown by Upwork ("2 hours ago", "yesterday", ...)
+        :param now: Time the page was loaded, in seconds since the epoch
+        :return: Posting time in seconds since the epoch, or None if it can not be read
+    """
+    relative_time = relative_time.lower()
+    if "just now" in relative_time:
+        return now
+    if "yesterday" in relative_time:
+        return now - TIME_UNITS["day"]
+    found = RELATIVE_TIME_PATTERN.search(relative_time)
+    if found is None:
+        return None
+    amount = 1 if found.group(1) in ("a", "an", "one") else int(found.group(1))
+    return now - amount * TIME_UNITS[found.group(2)]
+
+
+def get_job_tiles(html_page: str) -> list:
+    """
+        Get the link of every job of a search result page with the job fields already shown on its tile.
+        A field is None when the tile does not show it.
+    """
+    now = time.time()
+    client_ids = get_search_client_ids(html_page)
+    tiles = []
+    for link in SELECTORS["job_links"].select(parse_html(html_page)):
+        tile = link.find_parent(attrs={"data-test": "JobTile"})
+        fields = {"job_link": link.get("href"), "proposal_count": None, "payment_verified": None,
+                  "total_spent": None, "total_spent_exact": False, "ratings": None, "posted_at": None,
+                  "client_id": client_ids.get(get_job_id(link.get("href")))}
+        if tile is not None:
+            try:
+                fields["proposal_count"] = SELECTORS["tile_proposals"].select_one(tile).get_text(strip=True)
+            except AttributeError:
+                pass
+            try:
+                fields["payment_verified"] = SELECTORS["tile_payment"].select_one(tile).get_text(
+                    strip=True) == "Payment verified"
+            except AttributeError:
+                pass
+            try:
+                fields["total_spent"], fields["total_spent_exact"] = get_tile_total_spent(tile)
+            except (AttributeError, ValueError):
+                pass
+            try:
+                fields["ratings"] = float(
+                    SELECTORS["tile_rating"].select_one(tile).get_text(strip=True).split()[2])  # Rating is 4.9 out of 5
+            except (AttributeError, ValueError, IndexError):
+                pass
+            try:
+                fields["posted_at"] = parse_posted_time(SELECTORS["tile_posted"].select_one(tile).get_text(strip=True),
+                                                        now)
+            except AttributeError:
+                pass
+        tiles.append(fields)
+    return tiles
+
+
+def get_job_id(job_link: str) -> str:
+    """
+        Get the Upwork job id (~01...) from a job link. The whole link is used if it has no job id.
+    """
+    found = JOB_ID_PATTERN.search(job_link)
+    return found.group() if found else job_link
+
+
+def get_job_and_client_activity(soup):
+    """
+        Get the job activity and client activity html section from the parsed detail page.
+        :return: None if the page has not loaded the sections into the DOM yet
+    """
+    job_activity = SELECTORS["job_activity"].select_one(soup)
+    client_activity = SELECTORS["client_activity"].select_one(soup)
+    exclamation_mark = False
+    if client_activity is None:
+        return None
+    try:
+        if job_activity.find("h4").get_text(strip=True) != "Activity on this job":
+            job_activity = SELECTORS["job_activity_fallback"].select_one(soup)
+            preferred_qualifications = SELECTORS["preferred_qualifications"].select_one(soup).find_all("li")
+            for each in preferred_qualifications:
+                if SELECTORS["qualification_warning"].select_one(each) is not None:
+                    exclamation_mark = True
+                    break
+    except AttributeError:
+        # The page has not loaded the job activity element into the DOM at time of scraping
+        return None
+    return {"job_activity": job_activity, "client_activity": client_activity, "exclamation_mark": exclamation_mark}
+
+
+def is_payload_wrapper(value) -> bool:
+    return isinstance(value, list) and bool(value) and value[0] in PAYLOAD_WRAPPERS
+
+
+def decode_payload(values: list):
+    """
+        Rebuild the value serialised in a Nuxt payload (devalue format): a flat list of values in which the objects
+        and arrays hold the indexes of their items, and the first value is the root.
+        The values are rebuilt without recursion, as a payload can be deeply nested or refer to itself.
+    """
+    decoded = {}
+    filling = []  # (container, payload value) whose items are still to be decoded
+
+    def create(value):
+        if isinstance(value, list) and value and isinstance(value[0], str):  # ["Type", ...]
+            kind, items = value[0], value[1:]
+            if kind in ("Date", "BigInt"):
+                return items[0]
+            if kind == "Set":
+                container = []
+            elif kind == "null":  # Object without a prototype: ["null", key, value, ...]
+                container, items = {}, dict(zip(items[::2], items[1::2]))
+            else:
+                return None
+        elif isinstance(value, (dict, list)):
+            container, items = type(value)(), value
+        else:
+            return value
+        filling.append((container, items))
+        return container
+
+    def get(index):
+        wrappers = []  # A wrapper only stands for the value it wraps
+        while index >= 0 and index not in decoded and is_payload_wrapper(values[index]):
+            if index in wrappers:  # Wrappers wrapping each other
+                index = -1
+                break
+            wrappers.append(index)
+            index = values[index][1] if len(values[index]) > 1 else -1
+        if index < 0:
+            result = PAYLOAD_CONSTANTS.get(index)
+        elif index in decoded:
+            result = decoded[index]
+        else:
+            result = decoded[index] = create(values[index])
+        for each in wrappers:
+            decoded[each] = result
+        return result
+
+    root = get(0)
+    while filling:
+        container, items = filling.pop()
+        if isinstance(container, dict):
+            container.update((key, get(item)) for key, item in items.items())
+        else:
+            container.extend(get(item) for item in items)
+    return root
+
+
+def get_page_state(html_page: str):
+    """
+        Find and decode the JSON state embedded in a page
+        :return: The decoded state, or None if the page has no state or its state can not be decoded
+    """
+    found = STATE_PATTERN.search(html_page)
+    if found is None:
+        return None
+    try:
+        state = json.loads(found.group(1))
+        return decode_payload(state) if isinstance(state, list) else state
+    except (ValueError, IndexError, TypeError, RecursionError):  # JSONDecodeError is a ValueError
+        return None
+
+
+def walk_state(state):
+    """
+        :return: Iterator over every object of a page state, each one once as the state can refer to itself
+    """
+    pending = [state]
+    visited = set()  # Ids of the objects and arrays already looked at
+    while pending:
+        value = pending.pop()
+        if not isinstance(value, (dict, list)) or id(value) in visited:
+            continue
+        visited.add(id(value))
+        if isinstance(value, dict):
+            yield value
+            pending.extend(value.values())
+        else:
+            pending.extend(value)
+
+
+def find_job_state(state):
+    """
+        :return: The object of the page state that holds the job and its client, or None if there is none
+    """
+    for value in walk_state(state):
+        if isinstance(value.get("job"), dict) and isinstance(value.get("buyer"), dict):
+            return value
+    return None
+
+
+def get_search_client_ids(html_page: str) -> dict:
+    """
+        :return: dict of job id -> client id of the jobs of a search result page, read from the state embedded in the
+        page. It is empty when the page has no state, the tiles themselves do not show who the client is.
+    """
+    client_ids = {}
+    for value in walk_state(get_page_state(html_page)):
+        if not isinstance(value.get(SEARCH_STATE_JOB_ID), str):
+            continue
+        try:
+            client_id = get_state_client_id(get_state_value(value, SEARCH_STATE_COMPANY_ID_PATH))
+        except (KeyError, IndexError, TypeError):
+            continue
+        if client_id is not None:
+            client_ids[value[SEARCH_STATE_JOB_ID]] = client_id
+    return client_ids
+
+
+def get_state_value(job_state: dict, path: tuple):
+    value = job_state
+    for key in path:
+        value = value[key]
+    return value
+
+
+def get_proposal_range(applicants: int) -> str:
+    """
+        :return: The range of proposals shown by Upwork for a number of applicants
+    """
+    for upper_bound, proposal_range in PROPOSAL_RANGES:
+        if applicants < upper_bound:
+            return proposal_range
+    return "50+"
+
+
+def get_state_client_id(company_id):
+    """
+        :return: The id of the client in the client cache, or None if the client can not be told apart from the others
+    """
+    return "company:{0}".format(company_id) if company_id else None
+
+
+def get_client_id(html_page: str):
+    """
+        Identify the client of a job detail page by the company id of the buyer in the page state. The markup does not
+        show an identifier of the client, and clients of the same city joining on the same day would look the same.
+        :return: None if the page has no state, like the job details section of a page loaded in the browser
+    """
+    try:
+        company_id = get_state_value(find_job_state(get_page_state(html_page)), STATE_OPTIONAL_PATHS["company_id"])
+    except (KeyError, IndexError, TypeError):
+        return None
+    return get_state_client_id(company_id)
+
+
+def get_browser_interviewing_and_invites(job_texts: dict):
+    """
+        Same as get_no_of_interviewing_and_invites, from the texts read by the BrowserEngine
+    """
+    for interviewing_item, invites_item in (("activity_item_2", "activity_item_3"),
+                                            ("activity_item_3", "activity_item_4"),
+                                            ("activity_item_4", "activity_item_5")):
+        try:
+            return int(job_texts[interviewing_item].strip("Interviewing:")), int(
+                job_texts[invites_item].strip("Invites sent:"))
+        except ValueError:
+            continue
+        except AttributeError:
+            break
+    return None, None  # Job is no longer available
+
+
+def get_browser_client_fields(texts: dict) -> dict:
+    """
+        Same as the client extractors of the SoupEngine, from the texts read by the BrowserEngine
+    """
+    client_texts = texts['client']
+    try:
+        hired_count = int(client_texts['client_hires'].split()[0])
+    except (AttributeError, ValueError):
+        hired_count = 0
+    if texts['client_hire_rate'] is not None:
+        hire_rate = int(texts['client_hire_rate'].split()[0].strip("%"))
+    else:
+        hire_rate = math.ceil(hired_count / int(client_texts['client_jobs_posted'].split()[0].replace(',', '')) * 100)
+    payment = next((client_texts[name] for name in ("enterprise_payment", "payment_muted", "payment_strong")
+                    if client_texts[name] is not None), None)
+    return {
+        "payment_verified": payment == "Payment method verified",
+        "total_spent": parse_total_spent(client_texts['client_total_spent'] or "0"),
+        "ratings": float(client_texts['client_ratings'].split()[0]) if client_texts['client_ratings'] else 0,
+        "hire_rate": hire_rate,
+    }
+
+
+def timed(extractor, *args):
+    """
+        Call an extractor and record its time in the "extract.<extractor name>" stage of the metrics
+    """
+    with METRICS.timer("extract." + extractor.__name__):
+        return extractor(*args)
+
+
+class SoupEngine:
+    """
+        Extraction engine that reads the job fields from the rendered markup of the job detail page
+    """
+    name = "soup"
+    whole_page = False  # The job details section of the page is enough
+    script = None  # Script run in the browser that returns the page given to extract instead of its html
+
+    def extract(self, detail_page_html: str):
+        """
+            Parse the job detail page once and fill every job field from it.
+            The html can be the job details section of the page or the whole page.
+            :return: dict of the job fields, or None if the page has not been fully loaded
+        """
+        with METRICS.timer("parse"):
+            soup = parse_html(detail_page_html)
+        soup = SELECTORS["job_details_loader"].select_one(soup) or soup
+        activities = timed(get_job_and_client_activity, soup)
+        if activities is None:
+            return None
+        job_activity = activities['job_activity']
+        client_activity = activities['client_activity']
+        interviewing_count_and_invite_count = timed(get_no_of_interviewing_and_invites, job_activity)
+        return {
+            "job_name": SELECTORS["job_name"].select_one(soup).get_text(strip=True),
+            "proposal_count": timed(get_proposal_count, job_activity),
+            "payment_verified": timed(get_payment_verification, client_activity),
+            "exclamation_mark": activities['exclamation_mark'],
+            "no_interviewing": interviewing_count_and_invite_count['interviewing_no'],
+            "invites_count": interviewing_count_and_invite_count['invites_count'],
+            "hired_count": timed(get_no_hires, job_activity),
+            "total_spent": timed(get_total_amount_spent, client_activity),
+            "ratings": timed(get_employer_ratings, client_activity),
+            "hire_rate": timed(get_hire_rate, soup, client_activity, timed(get_total_hire_count, client_activity)),
+            "client_id": timed(get_client_id, detail_page_html),
+        }
+
+
+class StateEngine:
+    """
+        Extraction engine that reads the job fields from the JSON state embedded in the job detail page, and falls back
+        to the SoupEngine when the page has no state or the state misses a field
+    """
+    name = "state"
+    whole_page = True  # The state is not in the job details section of the page
+    script = None
+
+    def __init__(self):
+        self.fallback = SoupEngine()
+
+    def extract(self, detail_page_html: str):
+        """
+            Decode the state of the job detail page and map it to the fields of the SoupEngine
+            :return: dict of the job fields, or None if the page has not been fully loaded
+        """
+        with METRICS.timer("state_decode"):
+            job_state = find_job_state(get_page_state(detail_page_html))
+        try:
+            values = {field: get_state_value(job_state, path) for field, path in STATE_PATHS.items()}
+        except (KeyError, IndexError, TypeError):
+            values = None
+        # A field left to null (undefined in the payload) is missing too
+        if values is None or any(value is None for value in values.values()):
+            METRICS.increment("state_fallbacks")
+            return self.fallback.extract(detail_page_html)
+        for field, path in STATE_OPTIONAL_PATHS.items():
+            try:
+                values[field] = get_state_value(job_state, path)
+            except (KeyError, IndexError, TypeError):
+                values[field] = None
+
+        return {
+            "job_name": values['job_name'],
+            "proposal_count": get_proposal_range(values['applicants']),
+            "payment_verified": bool(values['payment_verified']),
+            "exclamation_mark": any(not each.get("matched", True) for each in values['qualifications'] or []),
+            "no_interviewing": values['no_interviewing'],
+            "invites_count": values['invites_count'],
+            "hired_count": values['hired_count'],
+            "total_spent": values['total_spent'] or 0,
+            "ratings": values['ratings'] or 0,
+            "hire_rate": math.ceil(values['jobs_with_hires'] / values['jobs_posted'] * 100)
+            if values['jobs_posted'] else 0,
+            "client_id": get_state_client_id(values['company_id']),
+        }
+
+
+class BrowserEngine:
+    """
+        Extraction engine that reads the texts of the job fields in the browser with BROWSER_EXTRACTION_SCRIPT, so that
+        only they are sent over the WebDriver protocol. It falls back to the SoupEngine for the pages fetched in the
+        "http" fetch mode. The texts do not identify the client, its id is taken from the search result tile.
+    """
+    name = "browser"
+    whole_page = False
+    script = BROWSER_EXTRACTION_SCRIPT
+    script_args = (SELECTOR_CSS, BROWSER_JOB_TEXTS, BROWSER_CLIENT_TEXTS)
+
+    def __init__(self):
+        self.fallback = SoupEngine()
+
+    def extract(self, detail_page: str):
+        """
+            :param detail_page: JSON string returned by BROWSER_EXTRACTION_SCRIPT, or the html of the page
+            :return: dict of the job fields, or None if the page has not been fully loaded
+        """
+        if not detail_page.startswith("{"):
+            return self.fallback.extract(detail_page)
+        texts = json.loads(detail_page)
+        client_fields = get_browser_client_fields(texts)
+        no_interviewing, invites_count = get_browser_interviewing_and_invites(texts['job'])
+        hired_count = 0
+        for each in texts['activity_list'] or []:
+            temp = each.split(":")
+            if temp[0] == "Hires":
+                hired_count = int(temp[1])
+        return {
+            "job_name": texts['job_name'],
+            "proposal_count": texts['job']['activity_item_1'],
+            "payment_verified": client_fields['payment_verified'],
+            "exclamation_mark": texts['exclamation_mark'],
+            "no_interviewing": no_interviewing,
+            "invites_count": invites_count,
+            "hired_count": hired_count,
+            "total_spent": client_fields['total_spent'],
+            "ratings": client_fields['ratings'],
+            "hire_rate": client_fields['hire_rate'],
+            "client_id": None,
+        }
+
+
+EXTRACTION_ENGINES = {SoupEngine.name: SoupEngine, StateEngine.name: StateEngine, BrowserEngine.name: BrowserEngine}
@@ -0,0 +1,84 @@
+import argparse
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from extractors import get_job_id
+
+"""
+    Local stand-in for Upwork that serves the saved pages in fixtures/
+
+    Run fixture_server.py and point the bot to http://127.0.0.1:8000/nx/search/jobs/?q=python with the "http" fetch
+    mode and base_url="http://127.0.0.1:8000" to crawl the saved pages without an Upwork account.
+    The first search result page is fixtures/search/page_1.html, every later page has no results.
+"""
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Job id of each job of fixtures/search/page_1.html -> its detail page in fixtures/detail/
+JOB_FIXTURES = {
+    "~0171a2b3c4d5e6f7a8": "standard",
+    "~0182b3c4d5e6f7a8b9": "last_viewed",
+    "~0193c4d5e6f7a8b9c0": "hires_listed",
+    "~01a4d5e6f7a8b9c0d1": "preferred_qualifications",
+    "~01b5e6f7a8b9c0d1e2": "job_unavailable",
+}
+
+DETAIL_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Job details - Upwork</title></head>
+<body><div id="main"><div class="job-details-loader">{0}</div></div></body>
+</html>
+"""
+
+
+def read_fixture(kind: str, name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, kind, name + ".html"), encoding="utf-8") as fp:
+        return fp.read()
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep the connections alive like Upwork does
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith("/nx/search/jobs"):
+            page_no = parse_qs(url.query).get("page", ["1"])[0]
+            self.send_page(read_fixture("search", "page_1" if page_no == "1" else "no_results"))
+        elif url.path.startswith("/jobs/") and get_job_id(url.path) in JOB_FIXTURES:
+            self.send_page(DETAIL_PAGE.format(read_fixture("detail", JOB_FIXTURES[get_job_id(url.path)])))
+        else:
+            self.send_error(404)
+
+    def send_page(self, html_page: str):
+        body = html_page.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(port: int = 0):
+    """
+        Serve the fixtures from a background thread
+        :param port: Port to listen on, 0 picks a free port
+        :return: The server and its base url. Call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{0}".format(server.server_address[1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the saved Upwork pages of fixtures/")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    fixture_server = ThreadingHTTPServer(("127.0.0.1", args.port), FixtureRequestHandler)
+    print("Serving the fixtures on http://127.0.0.1:{0}".format(args.port))
+    fixture_server.serve_forever()
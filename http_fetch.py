@@ -0,0 +1,88 @@
+import urllib3
+
+from metrics import METRICS
+
+try:
+    import httpx
+    HTTP_ERRORS = (urllib3.exceptions.HTTPError, httpx.HTTPError)
+except ImportError:
+    httpx = None
+    HTTP_ERRORS = (urllib3.exceptions.HTTPError,)
+
+"""
+    Fetching of Upwork pages over plain HTTP with the cookies of a logged-in browser.
+
+    The pages are fetched by a pooled client that keeps its connections alive, so once the browser has logged in it
+    is not needed to load the search result and job detail pages.
+"""
+
+
+class HttpFetcher:
+    """
+        Pooled HTTP client sending the cookies of a logged-in browser session.
+
+        It uses urllib3, or httpx when HTTP/2 is asked for and httpx (with its http2 extra) is installed.
+        It can be shared by several threads.
+    """
+
+    def __init__(self, cookies: list, user_agent: str = None, max_connections: int = 10, http2: bool = False,
+                 timeout: float = 10):
+        """
+        :param cookies: Cookies as returned by the browser's get_cookies()
+        :param user_agent: User agent of the browser the cookies come from
+        :param max_connections: Maximum number of open connections to a host
+        :param http2: Use HTTP/2 if httpx is installed
+        :param timeout: Seconds to wait for a page
+        """
+        self.timeout = timeout
+        headers = {"Accept": "text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8",
+                   "Accept-Language": "en-US,en;q=0.9"}
+        if cookies:
+            headers["Cookie"] = "; ".join("{0}={1}".format(each['name'], each['value']) for each in cookies)
+        if user_agent is not None:
+            headers["User-Agent"] = user_agent
+
+        self.client = None
+        if http2 and httpx is not None:
+            try:
+                self.client = httpx.Client(http2=True, headers=headers, timeout=timeout,
+                                           limits=httpx.Limits(max_connections=max_connections))
+            except ImportError:
+                print("HTTP/2 needs the h2 package, using HTTP/1.1")
+        if self.client is None:
+            self.pool = urllib3.PoolManager(maxsize=max_connections, block=True, headers=headers, retries=False,
+                                            timeout=urllib3.Timeout(total=timeout))
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        """
+            Create a fetcher logged in with the session of a browser
+        """
+        return cls(driver.get_cookies(), driver.execute_script("return navigator.userAgent;"), **kwargs)
+
+    def get(self, url: str):
+        """
+            :return: The html of the page, or None if it could not be loaded
+        """
+        try:
+            if self.client is not None:
+                response = self.client.get(url)
+                status, text = response.status_code, response.text
+            else:
+                response = self.pool.request("GET", url)
+                status, text = response.status, response.data.decode("utf-8", errors="replace")
+        except HTTP_ERRORS as exc:
+            METRICS.increment("http_errors")
+            print("Unable to load {0} ({1})".format(url, exc))
+            return None
+        if status != 200:
+            METRICS.increment("http_status_{0}".format(status))
+            print("Unable to load {0} (HTTP {1})".format(url, status))
+            return None
+        return text
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        else:
+            self.pool.clear()
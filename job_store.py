@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import time
+
+"""
+    Append-only store of every job evaluated by the bot.
+
+    Each evaluated job is written once as a line of JSON and flushed to disk straight away, so a crash can at most
+    lose the line being written. The matched_jobs.txt and matched_jobs.json files are exported from the matches found
+    during a run, or from every match of the store, whatever the run and the search, on demand by running job_store.py
+"""
+
+MATCHED_JOBS_TXT = "matched_jobs.txt"
+MATCHED_JOBS_JSON = "matched_jobs.json"
+
+
+class JobStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.fp = None
+
+    def append(self, job_details: dict):
+        """
+            Add an evaluated job to the end of the store and flush it to disk
+        """
+        if self.fp is None:
+            self.fp = open(self.path, mode="a", encoding="utf-8")
+        record = dict(job_details, evaluated_at=time.time())
+        self.fp.write(json.dumps(record) + "\n")
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+
+    def extend(self, records: list):
+        """
+            Add jobs read from another store, keeping their evaluation time
+        """
+        if self.fp is None:
+            self.fp = open(self.path, mode="a", encoding="utf-8")
+        for record in records:
+            self.fp.write(json.dumps(record) + "\n")
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def read_all(self) -> list:
+        """
+            :return: All the stored jobs, oldest first. An incomplete last line left by a crash is skipped.
+        """
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, encoding="utf-8") as fp:
+            for line in fp:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+        return records
+
+    def matched_jobs(self) -> list:
+        """
+            :return: The latest details of every stored job that meets the requirements
+        """
+        latest = {}
+        for record in self.read_all():
+            latest.pop(record['job_link'], None)  # Keep the order of the latest evaluation
+            latest[record['job_link']] = record
+        return [record for record in latest.values() if record['match']]
+
+
+def export_matches(matched_jobs: list, need_json_format: bool = True, txt_path: str = MATCHED_JOBS_TXT,
+                   json_path: str = MATCHED_JOBS_JSON) -> list:
+    """
+        Write the links of the matched jobs to matched_jobs.txt and their details to matched_jobs.json
+        :return: List of the matched jobs details
+    """
+    with open(txt_path, mode="w") as fp:
+        for each in matched_jobs:
+            fp.write(each['job_link'])
+            fp.write("\n")
+
+    if need_json_format:
+        with open(json_path, mode="w") as fp:
+            json.dump([{key: value for key, value in each.items() if key != "evaluated_at"} for each in matched_jobs],
+                      fp, indent=4)
+            fp.write('\n')
+    return matched_jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the matched jobs of a job store")
+    parser.add_argument("store", help="Path to the .jsonl job store")
+    parser.add_argument("--no-json", action="store_true", help="Only export matched_jobs.txt")
+    args = parser.parse_args()
+
+    exported = export_matches(JobStore(args.store).matched_jobs(), need_json_format=not args.no_json)
+    print("{0} matched jobs has been exported to {1}".format(len(exported), MATCHED_JOBS_TXT))
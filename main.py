@@ -1,6 +1,12 @@
 from bs4 import BeautifulSoup
 from selenium.common import TimeoutException
 from upwork import UpworkBot
+from driver_pool import DriverPool
+from http_fetch import HttpFetcher
+from pipeline import CrawlPipeline
+from sharding import ShardedCrawl
+from watch import SearchWatcher
+from metrics import METRICS, profiled
 
 
 """
@@ -15,6 +21,38 @@ from upwork import UpworkBot
     You can specified the max number of matching jobs you want in the MAXIMUM_MATCH_JOBS
     If you do not the json file, Please set the NEED_JSON_FORMAT to False
     Increase or decrease the timeout session in the TIMEOUT_AFTER
+    The browser waits for each page to be ready instead of sleeping. Set a wait name in WAIT_TIMEOUTS to give it its
+    own timeout in seconds, e.g. {"login_redirect": 30, "search_results": 5}. The time of each wait is in the metrics
+    Set NAVIGATE_BY_URL to False to open the job detail pages by clicking on them in the search result page
+    Set BROWSER_POOL_SIZE to the number of browser sessions that should evaluate job detail pages at the same time
+    Set EXTRACTION_ENGINE to choose how the job fields are read from the job detail pages: "soup" reads the rendered
+    markup, "state" decodes the JSON state embedded in the page and falls back to "soup" when the page has none,
+    "browser" reads only the texts of the job fields in the browser, waiting until the page shows them
+    Every evaluated job is appended to the RESULTS_FILE as it is found. The matched jobs files only list the matches
+    of the last run, run job_store.py RESULTS_FILE to export every match of the RESULTS_FILE, from all the runs
+    Jobs evaluated less than SEEN_JOB_TTL seconds ago (kept in the SEEN_JOBS_FILE) are skipped on a rerun
+    The statistics of the last CLIENT_CACHE_SIZE clients are kept for CLIENT_CACHE_TTL seconds in the
+    CLIENT_CACHE_FILE, and the jobs of a client that fails the requirements are rejected on their search result tile
+    without reading their page. Clients are told apart by the company id in the state embedded in the search result
+    pages, so the cache has no effect when these pages have no state, which is the case in the default mode (browser
+    fetch mode with the "soup" engine) unless Upwork embeds it. A job whose page is read is always evaluated with the
+    statistics shown on the page, which then replace the cached ones
+    After a successful login the browser session is saved to the SESSION_FILE, and later runs reuse it without asking
+    for the login credentials until it expires. Set SESSION_FILE to None to always log in
+    Set LEAN_BROWSER to True to stop the browser from downloading images, fonts, stylesheets and trackers. Without
+    the stylesheets Upwork may not show the elements the bot waits for, so check that the login still works with it
+    Set FETCH_MODE to "http" to only use the browser to log in, and fetch the search result and job detail pages with
+    a pooled HTTP client of HTTP_MAX_CONNECTIONS connections (HTTP/2 if HTTP2 is True and httpx is installed)
+    Set CRAWL_PIPELINE to True to load the search result pages, load the job detail pages, parse them and save them
+    at the same time. PIPELINE_CONCURRENCY job detail pages are loaded at once in the "http" fetch mode, and at most
+    PIPELINE_QUEUE_SIZE items wait between two of these stages
+    Set SEARCH_SHARDS to the number of worker processes that crawl separate ranges of PAGES_PER_SHARD_CLAIM search
+    result pages at the same time. The worker processes log in with the SESSION_FILE
+    Set WATCH_MODE to True to keep polling the search every WATCH_INTERVAL seconds for newly posted jobs, reading at
+    most WATCH_MAX_PAGES search result pages per poll. Matches are saved as soon as they are found
+    The time taken by each stage of the crawl is saved to the METRICS_FILE at the end of the run. Set PROMETHEUS_FILE
+    or METRICS_PORT to also export it in the Prometheus text format during the run, and PROFILER to "cprofile" or
+    "pyinstrument" to profile the crawl
     Change the value of each key in the REQUIREMENTS to apply filters
 
 """
@@ -22,7 +60,34 @@ from upwork import UpworkBot
 
 MAXIMUM_MATCH_JOBS = 10
 TIMEOUT_AFTER = 10
+WAIT_TIMEOUTS = {}
 NEED_JSON_FORMAT = True
+NAVIGATE_BY_URL = True
+BROWSER_POOL_SIZE = 1
+EXTRACTION_ENGINE = "soup"
+RESULTS_FILE = "evaluated_jobs.jsonl"
+SEEN_JOBS_FILE = "seen_jobs.sqlite3"
+SEEN_JOB_TTL = 24 * 60 * 60
+CLIENT_CACHE_FILE = "client_profiles.json"
+CLIENT_CACHE_TTL = 7 * 24 * 60 * 60
+CLIENT_CACHE_SIZE = 5000
+SESSION_FILE = "upwork_session.json"
+LEAN_BROWSER = False
+FETCH_MODE = "browser"
+HTTP_MAX_CONNECTIONS = 10
+HTTP2 = False
+CRAWL_PIPELINE = False
+PIPELINE_CONCURRENCY = 4
+PIPELINE_QUEUE_SIZE = 20
+SEARCH_SHARDS = 1
+PAGES_PER_SHARD_CLAIM = 2
+WATCH_MODE = False
+WATCH_INTERVAL = 300
+WATCH_MAX_PAGES = 5
+METRICS_FILE = "crawl_metrics.json"
+PROMETHEUS_FILE = None
+METRICS_PORT = None
+PROFILER = None
 REQUIREMENTS = {
     "payment_verified": True,
     "exclamation_mark": False,
@@ -35,41 +100,98 @@ REQUIREMENTS = {
     "min_client_ratings": 3
 }
 
-if __name__ == "__main__":
 
-    # Input login credentials
+def ask_login_credentials():
+    """
+        Ask the user for the Upwork login credentials
+        :return: (username, password, secret answer) or None if the secret question option is incorrect
+    """
     username = input("What is your Upwork username/email? ")
     password = input("Enter your Upwork password? ")
     secret_ans = None
     secret_question = input("Do you have a secret question answer on Upwork? 'y' or 'n'? ")
 
-    try:
-        if secret_question == 'y' or secret_question == "n":
-            if secret_question == 'y':
-                secret_ans = input("What is the answer to your Upwork secret question? ")
+    if secret_question != 'y' and secret_question != "n":
+        return None
+    if secret_question == 'y':
+        secret_ans = input("What is the answer to your Upwork secret question? ")
+    return username, password, secret_ans
 
-            search_link = input("\nPlease input upwork Job search result link: ")
-            print("Just a moment!\nPlease wait ...\n")
 
-            scrap_bot = UpworkBot(search_url=search_link, requirements=REQUIREMENTS, timeout=TIMEOUT_AFTER, need_json_format=NEED_JSON_FORMAT)
-            login_successful = scrap_bot.login_into_upwork(username, password, secret_ans)
+def login(bot: UpworkBot) -> bool:
+    """
+        Log the bot in with the saved session, or else with the credentials asked to the user, and save the new session
+    """
+    login_successful = SESSION_FILE is not None and bot.login_with_saved_session(SESSION_FILE)
 
-            if login_successful:
-                print("Login Successful!!\n")
+    if not login_successful:
+        # Input login credentials
+        credentials = ask_login_credentials()
+        if credentials is None:
+            print("Incorrect option. Type 'y' for yes and 'n' for No")
+            print("Run program again!!")
+            raise SystemExit
+        login_successful = bot.login_into_upwork(*credentials)
+        if login_successful and SESSION_FILE is not None:
+            bot.save_session(SESSION_FILE)
+    return login_successful
 
-                # Get the job results
 
-                print("\nGetting List of jobs ... ")
-                print("This will take a moment. Please wait ...\n\n")
+if __name__ == "__main__":
 
-                scrap_bot.get_all_jobs_that_meets_requirements(MAXIMUM_MATCH_JOBS)
+    try:
+        search_link = input("\nPlease input upwork Job search result link: ")
+        print("Just a moment!\nPlease wait ...\n")
+
+        scrap_bot = UpworkBot(search_url=search_link, requirements=REQUIREMENTS, timeout=TIMEOUT_AFTER, need_json_format=NEED_JSON_FORMAT,
+                              navigate_by_url=NAVIGATE_BY_URL, extraction_engine=EXTRACTION_ENGINE,
+                              results_file=RESULTS_FILE, seen_jobs_file=SEEN_JOBS_FILE,
+                              seen_job_ttl=SEEN_JOB_TTL, lean_browser=LEAN_BROWSER, fetch_mode=FETCH_MODE,
+                              client_cache_file=CLIENT_CACHE_FILE, client_cache_ttl=CLIENT_CACHE_TTL,
+                              client_cache_size=CLIENT_CACHE_SIZE, wait_timeouts=WAIT_TIMEOUTS)
+        login_successful = login(scrap_bot)
+
+        if login_successful:
+            print("Login Successful!!\n")
+
+            # Get the job results
+
+            print("\nGetting List of jobs ... ")
+            print("This will take a moment. Please wait ...\n\n")
+
+            driver_pool = None
+            crawler = None
+            if CRAWL_PIPELINE:
+                crawler = CrawlPipeline(fetch_concurrency=PIPELINE_CONCURRENCY, queue_size=PIPELINE_QUEUE_SIZE)
+            elif SEARCH_SHARDS > 1 and SESSION_FILE is not None:
+                crawler = ShardedCrawl(SEARCH_SHARDS, SESSION_FILE, PAGES_PER_SHARD_CLAIM)
+            if FETCH_MODE == "http":
+                scrap_bot.http_fetcher = HttpFetcher.from_driver(scrap_bot.driver, max_connections=HTTP_MAX_CONNECTIONS,
+                                                                 http2=HTTP2, timeout=TIMEOUT_AFTER)
+            elif BROWSER_POOL_SIZE > 1 and not isinstance(crawler, ShardedCrawl):
+                driver_pool = DriverPool(scrap_bot, BROWSER_POOL_SIZE, SESSION_FILE)
+                driver_pool.start()
+            if PROMETHEUS_FILE is not None:
+                METRICS.start_prometheus_export(PROMETHEUS_FILE)
+            if METRICS_PORT is not None:
+                METRICS.start_http_server(METRICS_PORT)
+            try:
+                with profiled(PROFILER):
+                    if WATCH_MODE:
+                        SearchWatcher(scrap_bot, [search_link], WATCH_INTERVAL, WATCH_MAX_PAGES).watch()
+                    else:
+                        scrap_bot.get_all_jobs_that_meets_requirements(MAXIMUM_MATCH_JOBS, driver_pool, crawler)
+            finally:
+                METRICS.save_json(METRICS_FILE)
+                print("Time taken by each stage of the crawl has been saved to {0}".format(METRICS_FILE))
+                if driver_pool is not None:
+                    driver_pool.close()
+                if scrap_bot.http_fetcher is not None:
+                    scrap_bot.http_fetcher.close()
 
-            else:
-                print("Login Failed!!")
         else:
-            print("Incorrect option. Type 'y' for yes and 'n' for No")
-            print("Run program again!!")
+            print("Login Failed!!")
     except TimeoutException:
         print("Time Out. Please check your internet connection")
 
-# End of Main
\ No newline at end of file
+# End of Main
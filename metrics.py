@@ -0,0 +1,184 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+"""
+    Latency and throughput of each stage of the crawl.
+
+    The stages are timed with METRICS.timer("stage name") and the events (retries, timeouts, ...) are counted with
+    METRICS.increment("event name"). The numbers can be saved as a JSON summary at the end of a run, and exported in
+    the Prometheus text format to a file or an HTTP endpoint during long runs.
+    The parsing done in the processes of a CrawlPipeline is sent back with each parsed page and merged into the
+    metrics of the main process. The stages run by the worker processes of a ShardedCrawl are not measured.
+"""
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.timings = {}  # Stage name -> [count, total seconds, longest seconds]
+        self.counters = {}
+
+    def observe(self, stage: str, seconds: float):
+        with self.lock:
+            timing = self.timings.setdefault(stage, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, counter: str, amount: int = 1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def collect(self):
+        """
+            Take the timings and counters recorded so far, and start again from zero
+            :return: (timings, counters), to be merged into the metrics of another process
+        """
+        with self.lock:
+            collected = self.timings, self.counters
+            self.timings, self.counters = {}, {}
+            return collected
+
+    def merge(self, timings: dict, counters: dict):
+        with self.lock:
+            for stage, (count, total, longest) in timings.items():
+                timing = self.timings.setdefault(stage, [0, 0.0, 0.0])
+                timing[0] += count
+                timing[1] += total
+                timing[2] = max(timing[2], longest)
+            for counter, value in counters.items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def summary(self) -> dict:
+        """
+            :return: For every stage its number of calls, total, average and longest seconds and calls per second
+            of the stage's own time, and the value of every counter
+        """
+        with self.lock:
+            stages = {
+                stage: {"count": count, "total_seconds": total, "average_seconds": total / count,
+                        "max_seconds": longest, "per_second": count / total if total else None}
+                for stage, (count, total, longest) in sorted(self.timings.items())
+            }
+            return {"run_seconds": time.time() - self.started_at, "stages": stages, "counters": dict(self.counters)}
+
+    def save_json(self, path: str):
+        with open(path, mode="w") as fp:
+            json.dump(self.summary(), fp, indent=4)
+            fp.write('\n')
+
+    def prometheus_text(self) -> str:
+        summary = self.summary()
+        lines = ["# TYPE upwork_bot_stage_seconds summary"]
+        for stage, timing in summary["stages"].items():
+            lines.append('upwork_bot_stage_seconds_count{{stage="{0}"}} {1}'.format(stage, timing["count"]))
+            lines.append('upwork_bot_stage_seconds_sum{{stage="{0}"}} {1}'.format(stage, timing["total_seconds"]))
+        lines.append("# TYPE upwork_bot_stage_max_seconds gauge")
+        for stage, timing in summary["stages"].items():
+            lines.append('upwork_bot_stage_max_seconds{{stage="{0}"}} {1}'.format(stage, timing["max_seconds"]))
+        lines.append("# TYPE upwork_bot_events_total counter")
+        for counter, value in sorted(summary["counters"].items()):
+            lines.append('upwork_bot_events_total{{event="{0}"}} {1}'.format(counter, value))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """
+            Replace the file in one step, so that a reader never sees a partly written file
+        """
+        with open(path + ".tmp", mode="w") as fp:
+            fp.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+    def start_prometheus_export(self, path: str, interval: float = 15):
+        """
+            Write the Prometheus text file every interval seconds from a background thread
+        """
+        def export():
+            while True:
+                self.write_prometheus(path)
+                time.sleep(interval)
+        threading.Thread(target=export, daemon=True).start()
+
+    def start_http_server(self, port: int):
+        """
+            Serve the Prometheus text format on http://127.0.0.1:port/metrics from a background thread
+        """
+        metrics = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+METRICS = Metrics()
+
+
+@contextlib.contextmanager
+def profiled(profiler: str = None, output_path: str = "crawl_profile"):
+    """
+        Profile the code run inside the with block.
+        :param profiler: "cprofile", "pyinstrument" (if installed) or None to not profile
+        :param output_path: The cProfile stats are saved to output_path.prof, the pyinstrument report to
+        output_path.html
+    """
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(output_path + ".prof")
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(20)
+            print(stream.getvalue())
+    elif profiler == "pyinstrument" and pyinstrument is not None:
+        profile = pyinstrument.Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(output_path + ".html", mode="w") as fp:
+                fp.write(profile.output_html())
+            print(profile.output_text())
+    else:
+        if profiler is not None:
+            print("Profiler {0} is not available, the crawl is not profiled".format(profiler))
+        yield
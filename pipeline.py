@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import extractors
+from metrics import METRICS
+from retry import backoff_delay
+
+"""
+    asyncio crawl pipeline.
+
+    The crawl is split into stages joined by bounded queues, so that every stage makes progress at the same time:
+
+        search result pages -> job links -> job detail pages -> job details -> job store
+          (producer)          (fetchers)       (evaluator)       (writer)
+
+    The fetchers load the job detail pages concurrently, with the HTTP fetcher or the browsers of a DriverPool.
+    The parsing of the pages runs in a pool of processes, with one evaluator per process. When a queue is full the
+    stage before it waits, which keeps the memory flat, and the next search result page is loaded while the jobs of the
+    current one are evaluated.
+    The client cache is looked up on the search result tiles only, before the detail pages are queued: a parsed page
+    always gives the latest statistics of its client.
+"""
+
+
+def extract_in_process(engine, detail_page_html: str):
+    """
+        Extract the job fields in a process of the pool
+        :return: The job fields, and the (timings, counters) of the metrics recorded while extracting them
+    """
+    METRICS.collect()  # Drop the metrics copied from the main process or left by an earlier page
+    job_fields = engine.extract(detail_page_html)
+    return job_fields, METRICS.collect()
+
+
+class CrawlPipeline:
+    def __init__(self, fetch_concurrency: int = 4, queue_size: int = 20, extract_workers: int = None,
+                 max_trials: int = 10, retry_base_delay: float = 1, retry_max_delay: float = 60):
+        """
+        :param fetch_concurrency: Number of job detail pages loaded at the same time in the "http" fetch mode
+        :param queue_size: Maximum number of items waiting between two stages
+        :param extract_workers: Number of processes parsing the pages, defaults to the number of CPUs
+        :param max_trials: Maximum number of times a job detail page is loaded before the job is dropped
+        :param retry_base_delay: Seconds before the first reload of a job detail page, doubled at each reload
+        :param retry_max_delay: Longest wait before reloading a job detail page
+        """
+        self.fetch_concurrency = fetch_concurrency
+        self.queue_size = queue_size
+        self.extract_workers = extract_workers or os.cpu_count()
+        self.max_trials = max_trials
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+    def crawl(self, bot, no_of_jobs: int, driver_pool=None):
+        """
+            Evaluate the jobs of the bot's search until the number of matching jobs or the last page is reached
+            :param bot: Logged-in UpworkBot
+            :param no_of_jobs: No of matching jobs to be retrieved
+            :param driver_pool: Started DriverPool whose browsers load the job detail pages in the "browser" fetch mode
+        """
+        asyncio.run(_PipelineRun(self, bot, no_of_jobs, driver_pool).run())
+
+
+class _PipelineRun:
+    """
+        State of one run of the pipeline
+    """
+
+    def __init__(self, pipeline: CrawlPipeline, bot, no_of_jobs: int, driver_pool):
+        self.pipeline = pipeline
+        self.bot = bot
+        self.no_of_jobs = no_of_jobs
+        # Without a DriverPool the bot's own browser loads both the search result and the job detail pages, one at a
+        # time
+        self.driver_lock = threading.Lock() if bot.fetch_mode == "browser" and driver_pool is None else None
+        if bot.fetch_mode == "http":
+            self.fetchers = [bot.retrieve_job_details] * pipeline.fetch_concurrency
+        elif driver_pool is not None:
+            self.fetchers = [self.browser_fetcher(worker) for worker in driver_pool.workers]
+        else:
+            self.fetchers = [self.browser_fetcher(bot, self.driver_lock)]
+        self.job_links = asyncio.Queue(pipeline.queue_size)
+        self.detail_pages = asyncio.Queue(pipeline.queue_size)
+        self.job_details = asyncio.Queue(pipeline.queue_size)
+        self.pending = 0  # Job links produced and not yet written or dropped
+        self.producer_done = False
+        self.done = asyncio.Event()
+        self.error = None
+        self.executor = None
+        self.retries = set()  # Tasks waiting to put a job link back, kept until they are done
+
+    @staticmethod
+    def browser_fetcher(worker, driver_lock=None):
+        def fetch(job_link):
+            with driver_lock or contextlib.nullcontext():
+                worker.driver.get(job_link)
+                return worker.retrieve_job_details(job_link)
+        return fetch
+
+    def load_search_page(self, page_no: int):
+        with self.driver_lock or contextlib.nullcontext():
+            return self.bot.load_search_page(page_no)
+
+    def check_done(self):
+        if self.producer_done and self.pending == 0:
+            self.done.set()
+
+    async def stage(self, coroutine):
+        """
+            Run a stage and stop the whole pipeline if it fails
+        """
+        try:
+            await coroutine
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.error = exc
+            self.done.set()
+
+    async def produce(self):
+        loop = asyncio.get_running_loop()
+        page_no = 1
+        previous_page_links = None
+        while True:
+            page_source = await asyncio.to_thread(self.load_search_page, page_no)
+            if page_source is None:
+                break
+            print("Retrieving all job links for page {0}...".format(page_no))
+            page_jobs_tiles = await loop.run_in_executor(self.executor, extractors.get_job_tiles, page_source)
+            page_jobs_links = [each['job_link'] for each in page_jobs_tiles]
+            # The last page has been passed when a page has no jobs or the same jobs as the previous page
+            if not page_jobs_links or page_jobs_links == previous_page_links:
+                break
+            for job_link in self.bot.select_job_links(page_jobs_tiles):
+                self.pending += 1
+                await self.job_links.put((job_link, 1))
+            previous_page_links = page_jobs_links
+            page_no += 1
+        self.producer_done = True
+        self.check_done()
+
+    async def fetch(self, fetcher):
+        while True:
+            job_link, trial = await self.job_links.get()
+            # Slow down every fetcher while the bot's circuit breaker is open
+            await asyncio.sleep(self.bot.circuit_breaker.wait_time())
+            detail_page_html = await asyncio.to_thread(fetcher, job_link)
+            await self.detail_pages.put((job_link, trial, detail_page_html))
+
+    async def evaluate(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_link, trial, detail_page_html = await self.detail_pages.get()
+            job_fields = None
+            if detail_page_html is not None:
+                with METRICS.timer("pipeline_extract"):
+                    job_fields, process_metrics = await loop.run_in_executor(
+                        self.executor, extract_in_process, self.bot.extraction_engine, detail_page_html)
+                METRICS.merge(*process_metrics)
+            self.bot.circuit_breaker.record(job_fields is not None)
+            if job_fields is not None:
+                await self.job_details.put(self.bot.get_job_details(job_link, job_fields))
+            elif trial < self.pipeline.max_trials:
+                # Load the page again after a backoff, without blocking this stage
+                METRICS.increment("retries")
+                retry = asyncio.ensure_future(self.retry_later(job_link, trial))
+                self.retries.add(retry)
+                retry.add_done_callback(self.retries.discard)
+            else:
+                METRICS.increment("jobs_given_up")
+                print("Unresponsive job detail page {0}, skipping it".format(job_link))
+                self.pending -= 1
+                self.check_done()
+
+    async def retry_later(self, job_link: str, trial: int):
+        await asyncio.sleep(backoff_delay(trial, self.pipeline.retry_base_delay, self.pipeline.retry_max_delay))
+        await self.job_links.put((job_link, trial + 1))
+
+    async def write(self):
+        while True:
+            job_details = await self.job_details.get()
+            print(job_details['job_link'])
+            self.bot.record_job_match(job_details)
+            self.pending -= 1
+            if len(self.bot.matched_job_links) >= self.no_of_jobs:
+                self.done.set()
+            self.check_done()
+
+    async def run(self):
+        with ProcessPoolExecutor(self.pipeline.extract_workers) as self.executor:
+            tasks = [asyncio.ensure_future(self.stage(self.produce())),
+                     asyncio.ensure_future(self.stage(self.write()))]
+            tasks += [asyncio.ensure_future(self.stage(self.fetch(fetcher))) for fetcher in self.fetchers]
+            tasks += [asyncio.ensure_future(self.stage(self.evaluate())) for _ in range(self.pipeline.extract_workers)]
+            await self.done.wait()
+            tasks += self.retries
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self.error is not None:
+            raise self.error
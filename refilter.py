@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+import operator
+import time
+
+from job_store import JobStore
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+    Offline re-filtering of the jobs of a job store with other requirements.
+
+    The REQUIREMENTS are compiled into one rule per requirement, and the rules are evaluated on whole columns of a
+    table of every evaluated job at once (with NumPy if it is installed, else with plain lists), so that new thresholds
+    can be tried on a saved crawl without loading any page again.
+    Run refilter.py evaluated_jobs.jsonl --set min_hire_rate=60 to see how many jobs each rule filters out.
+    The jobs dropped on their search result tile are stored with the fields of their tile only. A job that passes
+    every rule on the fields it has but misses a field needed by another rule can not be re-evaluated, and is counted
+    apart instead of being filtered out.
+"""
+
+# Requirement -> (job field, operator) of the check done by UpworkBot.meets_requirements
+RULES = {
+    "proposal_count": ("proposal_count", "in"),
+    "payment_verified": ("payment_verified", "=="),
+    "exclamation_mark": ("exclamation_mark", "=="),
+    "interviewing_no": ("no_interviewing", "<="),
+    "invites_count": ("invites_count", "<="),
+    "no_of_job_hires": ("hired_count", "<="),
+    "min_hire_rate": ("hire_rate", ">="),
+    "min_amount_spent": ("total_spent", ">="),
+    "min_client_ratings": ("ratings", ">="),
+}
+OPERATORS = {"==": operator.eq, "<=": operator.le, ">=": operator.ge}
+# Columns kept as text, the others are numbers where a missing value is NaN and fails every rule
+TEXT_FIELDS = ("proposal_count",)
+
+
+class JobTable:
+    """
+        Columns of the fields of the latest evaluation of every job of a job store
+    """
+
+    def __init__(self, records: list):
+        latest = {}
+        for record in records:
+            latest.pop(record['job_link'], None)  # Keep the order of the latest evaluation
+            latest[record['job_link']] = record
+        self.records = list(latest.values())
+        self.columns = {}
+        self.known = {}  # Field -> for every job True if the field has been read
+        for field, _ in RULES.values():
+            known = [record.get(field) is not None for record in self.records]
+            self.known[field] = numpy.array(known, dtype=bool) if numpy is not None else known
+            if field in TEXT_FIELDS:
+                column = [record.get(field) for record in self.records]
+                self.columns[field] = numpy.array(column, dtype=object) if numpy is not None else column
+            else:
+                column = [math.nan if record.get(field) is None else float(record[field]) for record in self.records]
+                self.columns[field] = numpy.array(column, dtype=float) if numpy is not None else column
+
+    @classmethod
+    def from_store(cls, path: str):
+        return cls(JobStore(path).read_all())
+
+    def __len__(self):
+        return len(self.records)
+
+
+class Rule:
+    def __init__(self, requirement: str, value):
+        self.requirement = requirement
+        self.field, self.operator = RULES[requirement]
+        self.value = list(value) if self.operator == "in" else value
+
+    def evaluate(self, table: JobTable):
+        """
+            :return: For every job of the table, True if it passes the rule. A job without the field fails it.
+        """
+        column = table.columns[self.field]
+        if numpy is not None:
+            if self.operator == "in":
+                return numpy.isin(column, self.value)
+            return OPERATORS[self.operator](column, self.value)
+        if self.operator == "in":
+            return [each in self.value for each in column]
+        compare = OPERATORS[self.operator]
+        return [compare(each, self.value) for each in column]
+
+
+class CompiledRequirements:
+    def __init__(self, requirements: dict):
+        """
+        :raise ValueError: If a requirement has no rule
+        """
+        unknown = set(requirements) - set(RULES)
+        if unknown:
+            raise ValueError("Unknown requirements: {0}".format(", ".join(sorted(unknown))))
+        self.rules = [Rule(requirement, value) for requirement, value in requirements.items()]
+
+    def evaluate(self, table: JobTable):
+        """
+            :return: For every job of the table True if it meets all the requirements, for every requirement the
+            number of jobs that have the field of the requirement and fail it, and the number of jobs that can not be
+            re-evaluated because they miss a field
+        """
+        rule_results = {rule.requirement: (rule.evaluate(table), table.known[rule.field]) for rule in self.rules}
+        if numpy is not None:
+            match = numpy.ones(len(table), dtype=bool)
+            possible = numpy.ones(len(table), dtype=bool)  # Passes every rule on the fields it has
+            for passed, known in rule_results.values():
+                match &= passed
+                possible &= passed | ~known
+            filtered_out = {requirement: int((known & ~passed).sum())
+                            for requirement, (passed, known) in rule_results.items()}
+            undetermined = int((possible & ~match).sum())
+        else:
+            match = [True] * len(table)
+            possible = [True] * len(table)
+            for passed, known in rule_results.values():
+                match = [each and rule_passed for each, rule_passed in zip(match, passed)]
+                possible = [each and (rule_passed or not is_known)
+                            for each, rule_passed, is_known in zip(possible, passed, known)]
+            filtered_out = {requirement: sum(is_known and not rule_passed
+                                             for rule_passed, is_known in zip(passed, known))
+                            for requirement, (passed, known) in rule_results.items()}
+            undetermined = sum(each and not matched for each, matched in zip(possible, match))
+        return match, filtered_out, undetermined
+
+    def matched_jobs(self, table: JobTable) -> list:
+        match, _, _ = self.evaluate(table)
+        return [record for record, matched in zip(table.records, match) if matched]
+
+
+def parse_setting(setting: str):
+    """
+        Read a --set requirement=value option. The value is read as JSON, or else as a comma separated list for the
+        proposal_count
+    """
+    requirement, _, value = setting.partition("=")
+    try:
+        return requirement, json.loads(value)
+    except json.JSONDecodeError:
+        return requirement, value.split(",") if requirement == "proposal_count" else value
+
+
+if __name__ == "__main__":
+    from main import REQUIREMENTS
+
+    parser = argparse.ArgumentParser(description="Filter the jobs of a job store again with other requirements")
+    parser.add_argument("store", help="Path to the .jsonl job store")
+    parser.add_argument("--requirements", default=None, help="JSON file of the requirements, defaults to the "
+                                                             "REQUIREMENTS of main.py")
+    parser.add_argument("--set", action="append", default=[], metavar="REQUIREMENT=VALUE",
+                        help="Change a requirement, e.g. --set min_hire_rate=60")
+    parser.add_argument("--output", default=None, help="Write the links of the matching jobs to this file")
+    args = parser.parse_args()
+
+    requirements = dict(REQUIREMENTS)
+    if args.requirements is not None:
+        with open(args.requirements) as fp:
+            requirements = json.load(fp)
+    requirements.update(parse_setting(setting) for setting in args.set)
+
+    job_table = JobTable.from_store(args.store)
+    compiled = CompiledRequirements(requirements)
+    start = time.perf_counter()
+    job_matches, rule_filtered_out, no_of_undetermined = compiled.evaluate(job_table)
+    elapsed = time.perf_counter() - start
+
+    print("{0} evaluated jobs, filtered in {1:.2f} ms{2}".format(len(job_table), elapsed * 1000,
+                                                                "" if numpy is not None else " (without NumPy)"))
+    for each_requirement, no_of_jobs in rule_filtered_out.items():
+        print("    {0:<20} {1!s:<30} filters out {2} jobs".format(each_requirement, requirements[each_requirement],
+                                                                   no_of_jobs))
+    matched_records = [record for record, matched in zip(job_table.records, job_matches) if matched]
+    print("{0} jobs meet the requirements".format(len(matched_records)))
+    if no_of_undetermined:
+        print("{0} jobs can not be re-evaluated: they pass the rules on the fields they have, but a field needed by "
+              "another rule was not read (e.g. jobs dropped on their search result tile)".format(no_of_undetermined))
+    if args.output is not None:
+        with open(args.output, mode="w") as fp:
+            for record in matched_records:
+                fp.write(record['job_link'])
+                fp.write("\n")
+        print("Links to the matching jobs has been saved to {0}".format(args.output))
@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+from metrics import METRICS
+
+"""
+    Retries of the job detail pages that could not be loaded.
+
+    A failed job is put back in its RetryQueue to be tried again after an exponential backoff with jitter, while the
+    other jobs go on, until its retry budget is spent. A CircuitBreaker shared by the whole crawl pauses every job
+    for a while when too many of the recent loads have failed.
+"""
+
+
+def backoff_delay(trial: int, base_delay: float, max_delay: float) -> float:
+    """
+        :return: Seconds to wait before trying a job again after its trial-th failure, randomised so that the retries
+        of several jobs do not all happen at the same time
+    """
+    delay = min(max_delay, base_delay * 2 ** (trial - 1))
+    return random.uniform(delay / 2, delay)
+
+
+class CircuitBreaker:
+    def __init__(self, window: int = 20, threshold: float = 0.5, pause: float = 30):
+        """
+        :param window: Number of recent job detail page loads looked at
+        :param threshold: Share of failed loads in the window that opens the circuit
+        :param pause: Seconds every job waits once the circuit is open
+        """
+        self.lock = threading.Lock()
+        self.outcomes = deque(maxlen=window)
+        self.threshold = threshold
+        self.pause = pause
+        self.paused_until = 0
+
+    def record(self, success: bool):
+        with self.lock:
+            self.outcomes.append(success)
+            if len(self.outcomes) == self.outcomes.maxlen and \
+                    self.outcomes.count(False) / len(self.outcomes) >= self.threshold:
+                print("Too many job detail pages are failing to load, pausing for {0} secs".format(self.pause))
+                METRICS.increment("circuit_breaker_opened")
+                self.paused_until = time.time() + self.pause
+                self.outcomes.clear()
+
+    def wait_time(self) -> float:
+        """
+            :return: Seconds left before the jobs can be loaded again
+        """
+        return max(0, self.paused_until - time.time())
+
+
+class RetryQueue:
+    """
+        Queue of jobs where a failed job is put back with a backoff. It can be shared by several threads.
+    """
+
+    def __init__(self, items: list, max_trials: int, circuit_breaker: CircuitBreaker, base_delay: float = 1,
+                 max_delay: float = 60):
+        """
+        :param items: Jobs to process, in order
+        :param max_trials: Number of times a job is tried before giving up on it
+        """
+        self.max_trials = max_trials
+        self.circuit_breaker = circuit_breaker
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.order = itertools.count()
+        self.heap = [(0, next(self.order), item, 1) for item in items]  # (ready at, order, item, trial)
+        self.in_flight = 0
+        self.stopped = False
+
+    def get(self):
+        """
+            Wait for the next job that is ready to be tried
+            :return: (item, trial), or None when every job is done or the queue has been stopped
+        """
+        with self.condition:
+            while not self.stopped:
+                if not self.heap:
+                    if self.in_flight == 0:
+                        return None
+                    self.condition.wait()  # A job being tried may be put back
+                    continue
+                wait = max(self.heap[0][0] - time.time(), self.circuit_breaker.wait_time())
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                _, _, item, trial = heapq.heappop(self.heap)
+                self.in_flight += 1
+                return item, trial
+            return None
+
+    def done(self, item, trial: int, success: bool) -> bool:
+        """
+            Report the result of a trial. A failed job is put back with a backoff if it has trials left.
+            :return: True if the job is finished, False if it will be tried again
+        """
+        self.circuit_breaker.record(success)
+        with self.condition:
+            self.in_flight -= 1
+            finished = True
+            if not success and trial < self.max_trials:
+                METRICS.increment("retries")
+                ready_at = time.time() + backoff_delay(trial, self.base_delay, self.max_delay)
+                heapq.heappush(self.heap, (ready_at, next(self.order), item, trial + 1))
+                finished = False
+            elif not success:
+                METRICS.increment("jobs_given_up")
+                print("Unresponsive job detail page after {0} trials, skipping it".format(trial))
+            self.condition.notify_all()
+            return finished
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
@@ -0,0 +1,50 @@
+import json
+import sqlite3
+import time
+
+from extractors import get_job_id
+
+"""
+    On-disk index of the jobs already evaluated by the bot, so that a rerun skips them before loading their detail page
+"""
+
+
+class SeenJobIndex:
+    """
+        SQLite index of the last evaluation of each job, keyed by the Upwork job id.
+
+        An evaluation is fresh for ttl seconds, after which the job is evaluated again.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS seen_jobs (job_id TEXT PRIMARY KEY, job_link TEXT, "
+                                "match INTEGER, details TEXT, evaluated_at REAL)")
+        self.connection.commit()
+
+    def get(self, job_link: str):
+        """
+            :return: The details of the last fresh evaluation of the job, or None if it has to be evaluated
+        """
+        row = self.connection.execute("SELECT details, evaluated_at FROM seen_jobs WHERE job_id = ?",
+                                      (get_job_id(job_link),)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def is_fresh(self, job_link: str) -> bool:
+        return self.get(job_link) is not None
+
+    def add(self, job_details: dict):
+        """
+            Save the evaluation of a job, replacing its previous one
+        """
+        self.connection.execute("INSERT OR REPLACE INTO seen_jobs VALUES (?, ?, ?, ?, ?)",
+                                (get_job_id(job_details['job_link']), job_details['job_link'],
+                                 int(job_details['match']), json.dumps(job_details), time.time()))
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
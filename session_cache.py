@@ -0,0 +1,58 @@
+import json
+import os
+
+from selenium.common import InvalidCookieDomainException
+
+"""
+    Cache of a logged-in Upwork browser session.
+
+    The cookies and local storage of the browser are saved to a file after a successful login, and loaded into new
+    browsers so that they are logged in without going through the login flow again.
+    The session file gives access to the Upwork account, keep it private.
+"""
+
+
+def save_session(driver, path: str):
+    """
+        Save the cookies and local storage of a logged-in browser to a file only readable by the current user
+    """
+    session = {
+        "cookies": driver.get_cookies(),
+        "local_storage": driver.execute_script("return Object.assign({}, window.localStorage);"),
+        "user_agent": driver.execute_script("return navigator.userAgent;"),
+    }
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), mode="w") as fp:
+        json.dump(session, fp)
+
+
+def load_session(driver, path: str, base_url: str) -> bool:
+    """
+        Load a saved session into a browser. The browser is left on the base url.
+        :return: False if there is no saved session
+    """
+    if path is None or not os.path.exists(path):
+        return False
+    with open(path) as fp:
+        session = json.load(fp)
+
+    driver.get(base_url)  # Cookies and local storage can only be set for the page's own domain
+    for cookie in session["cookies"]:
+        try:
+            driver.add_cookie(cookie)
+        except InvalidCookieDomainException:
+            pass
+    driver.execute_script("for (const [key, value] of Object.entries(arguments[0])) "
+                          "{ window.localStorage.setItem(key, value); }", session["local_storage"])
+    return True
+
+
+def load_session_cookies(path: str):
+    """
+        Read the cookies and the browser user agent of a saved session, to log in an HttpFetcher without a browser
+        :return: (cookies, user agent), or None if there is no saved session
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as fp:
+        session = json.load(fp)
+    return session["cookies"], session.get("user_agent")
@@ -0,0 +1,121 @@
+import multiprocessing
+import os
+
+from client_cache import ClientCache
+from http_fetch import HttpFetcher
+from job_store import JobStore
+from seen_jobs import SeenJobIndex
+from session_cache import load_session_cookies
+from upwork import UpworkBot, create_driver
+
+"""
+    Crawl of one job search by several worker processes.
+
+    Each worker process logs in with the saved session file and takes the next range of search result pages that no
+    other worker has taken, until the last page of the search or the number of matching jobs is reached.
+"""
+
+
+def _crawl_shard(shard_no: int, settings: dict, session_file: str, no_of_jobs: int, pages_per_claim: int,
+                 next_page, last_page, match_counter, prefiltered_counter):
+    """
+        Body of a worker process
+        :param next_page: Shared number of the first page not taken by a worker yet
+        :param last_page: Shared number of the last page of the search, 0 while it is not known
+        :param match_counter: Shared number of matching jobs found by all the workers
+        :param prefiltered_counter: Shared number of job detail pages not loaded thanks to the search result pre-filter
+    """
+    if settings["fetch_mode"] == "http":
+        session = load_session_cookies(session_file)
+        if session is None:
+            print("Shard {0}: no saved session to log in with".format(shard_no))
+            return
+        bot = UpworkBot(**settings, http_fetcher=HttpFetcher(*session, timeout=settings["timeout"]))
+    else:
+        bot = UpworkBot(**settings, driver=create_driver(settings["lean_browser"]))
+        if not bot.login_with_saved_session(session_file):
+            print("Shard {0}: unable to log in with the saved session".format(shard_no))
+            bot.driver.quit()
+            return
+    bot.match_counter = match_counter
+    bot.seen_jobs = SeenJobIndex(bot.seen_jobs_file, bot.seen_job_ttl)
+    bot.client_cache = ClientCache(bot.client_cache_file, bot.client_cache_ttl, bot.client_cache_size)
+    try:
+        while match_counter.value < no_of_jobs:
+            with next_page.get_lock():
+                first_page = next_page.value
+                next_page.value += pages_per_claim
+            if last_page.value and first_page > last_page.value:
+                break
+            print("Shard {0}: pages {1} to {2}".format(shard_no, first_page, first_page + pages_per_claim - 1))
+            search_last_page = bot.crawl_search_pages(no_of_jobs, first_page=first_page,
+                                                      last_page=first_page + pages_per_claim - 1)
+            if search_last_page is not None:
+                with last_page.get_lock():
+                    if not last_page.value or search_last_page < last_page.value:
+                        last_page.value = search_last_page
+    finally:
+        with prefiltered_counter.get_lock():
+            prefiltered_counter.value += bot.prefiltered_count
+        bot.seen_jobs.close()
+        bot.client_cache.close()
+        bot.job_store.close()
+        if bot.http_fetcher is not None:
+            bot.http_fetcher.close()
+        else:
+            bot.driver.quit()
+
+
+class ShardedCrawl:
+    def __init__(self, shards: int, session_file: str, pages_per_claim: int = 2):
+        """
+        :param shards: Number of worker processes
+        :param session_file: Saved session the worker processes log in with
+        :param pages_per_claim: Number of search result pages a worker takes at a time
+        """
+        self.shards = shards
+        self.session_file = session_file
+        self.pages_per_claim = pages_per_claim
+
+    def crawl(self, bot: UpworkBot, no_of_jobs: int, driver_pool=None):
+        """
+            Evaluate the jobs of the bot's search on all the worker processes, then add their results to the bot's
+            job store. The driver_pool is not used, every worker process has its own browser.
+        """
+        settings = {
+            "search_url": bot.search_url, "requirements": bot.requirements, "timeout": bot.timeout,
+            "need_json_format": bot.need_json_format, "navigate_by_url": bot.navigate_by_url,
+            "extraction_engine": bot.extraction_engine.name, "seen_jobs_file": bot.seen_jobs_file,
+            "seen_job_ttl": bot.seen_job_ttl, "lean_browser": bot.lean_browser, "fetch_mode": bot.fetch_mode,
+            "base_url": bot.base_url, "client_cache_file": bot.client_cache_file,
+            "client_cache_ttl": bot.client_cache_ttl, "client_cache_size": bot.client_cache_size,
+            "wait_timeouts": bot.wait_timeouts,
+        }
+        next_page = multiprocessing.Value("i", 1)
+        last_page = multiprocessing.Value("i", 0)
+        match_counter = multiprocessing.Value("i", 0)
+        prefiltered_counter = multiprocessing.Value("i", 0)
+        shard_stores = []
+        workers = []
+        for shard_no in range(1, self.shards + 1):
+            shard_store = "{0}.shard-{1}".format(bot.job_store.path, shard_no)
+            shard_stores.append(JobStore(shard_store))
+            workers.append(multiprocessing.Process(
+                target=_crawl_shard,
+                args=(shard_no, dict(settings, results_file=shard_store), self.session_file, no_of_jobs,
+                      self.pages_per_claim, next_page, last_page, match_counter, prefiltered_counter)))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        bot.prefiltered_count += prefiltered_counter.value
+
+        for shard_store in shard_stores:
+            records = shard_store.read_all()
+            bot.job_store.extend(records)
+            for record in records:
+                if record['match'] and record['job_link'] not in bot.matched_job_links:
+                    bot.matched_jobs_details.append(record)
+                    bot.matched_job_links.append(record['job_link'])
+            if os.path.exists(shard_store.path):
+                os.remove(shard_store.path)
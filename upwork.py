@@ -1,156 +1,166 @@
-import json
-import math
 import time
-from bs4 import BeautifulSoup
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
 from selenium import webdriver
 from selenium.common import NoSuchElementException, ElementNotInteractableException, ElementClickInterceptedException, \
-    TimeoutException, StaleElementReferenceException
+    TimeoutException, StaleElementReferenceException, InvalidCookieDomainException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
+
+import extractors
+from job_store import JobStore, export_matches, MATCHED_JOBS_TXT, MATCHED_JOBS_JSON
+from seen_jobs import SeenJobIndex
+from client_cache import ClientCache
+from session_cache import save_session, load_session
+from metrics import METRICS
+from retry import CircuitBreaker, RetryQueue, backoff_delay
+from waits import PageWaits, NetworkIdle
 
 UPWORK_BASE_URL = "https://www.upwork.com"
 UPWORK_LOGIN_PATH = UPWORK_BASE_URL + "/ab/account-security/login"
+UPWORK_FIND_WORK_URL = UPWORK_BASE_URL + "/nx/find-work/"
 
 chrome_options = webdriver.ChromeOptions()
 chrome_options.add_argument("--headless=new")
 chrome_options.add_argument("start-maximized")
 chrome_options.add_argument("disable-infobars")
-DRIVER = webdriver.Chrome(options=chrome_options)
 
-MAX_REQUEST_TRIAL = 10  # Max number of times to request a particular page in case of timeout.
 
+# Resources a lean browser does not download: images, fonts, stylesheets, media and third-party trackers
+LEAN_BLOCKED_EXTENSIONS = ("png", "jpg", "jpeg", "gif", "svg", "webp", "ico", "woff", "woff2", "ttf", "otf", "css",
+                           "mp4", "webm")
+LEAN_BLOCKED_URLS = [
+    # The links of the files, with or without a query string (style.css?v=3)
+    *("*.{0}".format(extension) for extension in LEAN_BLOCKED_EXTENSIONS),
+    *("*.{0}?*".format(extension) for extension in LEAN_BLOCKED_EXTENSIONS),
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*", "*facebook.net*", "*facebook.com/tr*",
+    "*hotjar.com*", "*bat.bing.com*", "*linkedin.com/px*", "*ads-twitter.com*", "*cdn.segment.com*",
+    "*optimizely.com*", "*qualtrics.com*", "*fullstory.com*",
+]
+
+
+def create_driver(lean: bool = False):
+    """
+        Start a new headless Chrome session with the bot's browser options
+        :param lean: Block the resources listed in LEAN_BLOCKED_URLS with request interception
+    """
+    if not lean:
+        return webdriver.Chrome(options=chrome_options)
+
+    lean_options = webdriver.ChromeOptions()
+    for argument in chrome_options.arguments:
+        lean_options.add_argument(argument)
+    lean_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    driver = webdriver.Chrome(options=lean_options)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+    return driver
+
+
+def get_driver(lean: bool = False):
+    """
+        Get the browser shared by the bots, it is started the first time it is needed
+    """
+    global DRIVER
+    if DRIVER is None:
+        DRIVER = create_driver(lean)
+    return DRIVER
+
+
+def set_url_params(url: str, **params) -> str:
+    """
+        Set query parameters of a link, replacing the ones it already has
+    """
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    query_params = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key not in params]
+    query_params += [(key, str(value)) for key, value in params.items()]
+    return urlunsplit((scheme, netloc, path, urlencode(query_params), fragment))
+
+
+def get_search_page_url(search_url: str, page_no: int) -> str:
+    """
+        Get the link to a page of a job search result by setting the page parameter of the search link
+    """
+    return set_url_params(search_url, page=page_no)
+
+
+def copy_session_cookies(source_driver, target_driver):
+    """
+        Copy the cookies of a logged-in browser session into another browser session so that it is logged in too
+    """
+    target_driver.get(UPWORK_BASE_URL)
+    for cookie in source_driver.get_cookies():
+        try:
+            target_driver.add_cookie(cookie)
+        except InvalidCookieDomainException:
+            pass
 
-class UpworkBot:
-    matched_jobs_details = []
-    matched_job_links = []
-    trial_count = 0
 
-    def __init__(self, search_url: str, requirements: dict, timeout: int, need_json_format: bool):
+DRIVER = None
+
+MAX_REQUEST_TRIAL = 10  # Max number of times to request a particular job detail page in case of timeout.
+RETRY_BASE_DELAY = 1  # Seconds to wait before the first retry of a job detail page, doubled at each retry
+RETRY_MAX_DELAY = 60
+
+
+class UpworkBot:
+    def __init__(self, search_url: str, requirements: dict, timeout: int, need_json_format: bool, driver=None,
+                 navigate_by_url: bool = False, extraction_engine: str = "soup",
+                 results_file: str = "evaluated_jobs.jsonl", seen_jobs_file: str = "seen_jobs.sqlite3",
+                 seen_job_ttl: float = 24 * 60 * 60, lean_browser: bool = False, fetch_mode: str = "browser",
+                 http_fetcher=None, base_url: str = UPWORK_BASE_URL,
+                 client_cache_file: str = "client_profiles.json", client_cache_ttl: float = 7 * 24 * 60 * 60,
+                 client_cache_size: int = 5000, matched_jobs_txt: str = MATCHED_JOBS_TXT,
+                 matched_jobs_json: str = MATCHED_JOBS_JSON, wait_timeouts: dict = None):
+        self.matched_jobs_details = []
+        self.matched_job_links = []
+        self.exported_jobs = []  # Matched jobs of this run last exported
+        self.prefiltered_count = 0  # Number of job detail pages not loaded because their search result tile failed
+        self.matched_jobs_txt = matched_jobs_txt
+        self.matched_jobs_json = matched_jobs_json
+        self._driver = driver
+        self.fetch_mode = fetch_mode
+        self.http_fetcher = http_fetcher
+        self.base_url = base_url
+        self.lean_browser = lean_browser
+        self.extraction_engine = extractors.EXTRACTION_ENGINES[extraction_engine]()
+        self.job_store = JobStore(results_file)
+        self.seen_jobs_file = seen_jobs_file
+        self.seen_job_ttl = seen_job_ttl
+        self.seen_jobs = None
+        self.client_cache_file = client_cache_file
+        self.client_cache_ttl = client_cache_ttl
+        self.client_cache_size = client_cache_size
+        self.client_cache = None
+        self.tile_client_ids = {}  # Job link -> client id read from the search result page, for the pages without it
+        self.match_counter = None  # Shared count of matching jobs when the crawl is sharded between processes
+        self.circuit_breaker = CircuitBreaker()
+        self.navigate_by_url = navigate_by_url
         self.search_url = search_url
         self.requirements = requirements
         self.timeout = timeout
+        self.wait_timeouts = wait_timeouts or {}  # Wait name -> seconds, the waits not in it time out after timeout
         self.need_json_format = need_json_format
         self.timeout_msg = "Webpage takes too long to load after".format(self.timeout)
 
-    @staticmethod
-    def get_no_of_interviewing_and_invites(job_activity: BeautifulSoup):
-        try:
-            interviewing_no = int(
-                job_activity.select_one('div > ul > li:nth-child(2)').get_text(strip=True).strip("Interviewing:"))
-            invites_count = int(
-                job_activity.select_one('div > ul > li:nth-child(3)').get_text(strip=True).strip("Invites sent:"))
-        except ValueError:
-            try:
-                interviewing_no = int(
-                    job_activity.select_one('div > ul > li:nth-child(3)').get_text(strip=True).strip("Interviewing:"))
-                invites_count = int(
-                    job_activity.select_one('div > ul > li:nth-child(4)').get_text(strip=True).strip("Invites sent:"))
-            except ValueError:
-                try:
-                    interviewing_no = int(
-                        job_activity.select_one('div > ul > li:nth-child(4)').get_text(strip=True).strip("Interviewing:"))
-                    invites_count = int(
-                        job_activity.select_one('div > ul > li:nth-child(5)').get_text(strip=True).strip("Invites sent:"))
-                except AttributeError:
-                    interviewing_no, invites_count = None, None  # Job is no longer available
-            except AttributeError:
-                interviewing_no, invites_count = None, None    #Job is no longer available
-        except AttributeError:
-            interviewing_no, invites_count = None, None  # Job is no longer available
-        return {"interviewing_no": interviewing_no, "invites_count": invites_count}
-
-    @staticmethod
-    def get_proposal_count(job_activity) -> str:
-        try:
-            proposal_count = job_activity.select_one(
-                "div > ul > li:nth-child(1) > span:nth-child(2) > span:nth-child(3)").get_text(
-                strip=True)
-        except AttributeError:
-            proposal_count = None  # Job is no longer available
-            # print("Job Unavailable")
-
-        return proposal_count
-
-    @staticmethod
-    def get_total_hire_count(client_activity) -> int:
-        try:
-            hired_count = int(
-                client_activity.select_one("div > ul > li:nth-child(3) > div").get_text(strip=True).split()[0])
-        except (AttributeError, ValueError):
-            hired_count = 0
-        return hired_count
-
-    @staticmethod
-    def get_hire_rate(soup, client_activity, hired_count):
-        try:
-            hire_rate = int(
-                soup.select_one("section.up-card-section.d-lg-none > div > ul > li:nth-child(2) > div").get_text(
-                    strip=True).split()[0].strip("%"))
-        except AttributeError:
-            job_post_str = client_activity.select_one("div > ul > li:nth-child(2) > strong").get_text(strip=True).split()[0]
-            try:
-                employer_jobs_posted = int(job_post_str)
-            except ValueError:
-                employer_jobs_posted = int(job_post_str.replace(',', ''))
-
-            hire_rate = math.ceil(float(hired_count / employer_jobs_posted) * 100)
-
-        return hire_rate
-
-    @staticmethod
-    def get_employer_ratings(client_activity):
-
-        try:
-            ratings = float(
-                client_activity.select_one("div.text-muted.rating.mb-20 > span").get_text(strip=True).split()[0])
-        except AttributeError:
-            ratings = 0
-
-        return ratings
-
-    @staticmethod
-    def get_no_hires(job_activity):
-        no_of_hires = 0
-        try:
-            for each in (job_activity.select_one("div > ul")).find_all("li"):
-                temp = each.get_text(strip=True).split(":")
-                if temp[0] == "Hires":
-                    no_of_hires = int(temp[1])
-        except AttributeError:
-            pass
-        return no_of_hires
-
-    @staticmethod
-    def get_payment_verification(client_activity):
-
-        try:
-            payment_verified = (client_activity.select_one("div.enterprise-payment.mb-10 > div > strong").get_text(
-                strip=True)) == "Payment method verified"
-        except AttributeError:
-            try:
-                payment_verified = (client_activity.select_one("div.mb-10 > div > div > span.text-muted").get_text(
-                    strip=True)) == "Payment method verified"
-            except AttributeError:
-                payment_verified = (client_activity.select_one("div.mb-10 > div > div > strong").get_text(
-                    strip=True)) == "Payment method verified"
-        return payment_verified
-
-    @staticmethod
-    def get_total_amount_spent(client_activity):
-        try:
-            total_spent = client_activity.select_one("div > ul > li:nth-child(3) > strong > span > span").get_text(
-                strip=True).strip('$')
-        except (AttributeError, ValueError):
-            total_spent = "0"
-
-        if 'K' in total_spent:
-            total_spent = float(total_spent.strip('K')) * 1000
-        elif "M" in total_spent:
-            total_spent = float(total_spent.strip("M")) * 1000000
-        else:
-            total_spent = int(total_spent)
-        return total_spent
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = get_driver(self.lean_browser)
+        return self._driver
+
+    @property
+    def waits(self) -> PageWaits:
+        return PageWaits(self.driver, self.timeout, self.wait_timeouts)
+
+    get_no_of_interviewing_and_invites = staticmethod(extractors.get_no_of_interviewing_and_invites)
+    get_proposal_count = staticmethod(extractors.get_proposal_count)
+    get_total_hire_count = staticmethod(extractors.get_total_hire_count)
+    get_hire_rate = staticmethod(extractors.get_hire_rate)
+    get_employer_ratings = staticmethod(extractors.get_employer_ratings)
+    get_no_hires = staticmethod(extractors.get_no_hires)
+    get_payment_verification = staticmethod(extractors.get_payment_verification)
+    get_total_amount_spent = staticmethod(extractors.get_total_amount_spent)
 
     @staticmethod
     def get_all_job_posting_links(html_page: str, page_no) -> list:
@@ -163,54 +173,82 @@ class UpworkBot:
         print("Retrieving all job links for page {0}...".format(page_no))
         print("Checking for requirements matches ...")
 
-        soup = BeautifulSoup(html_page, "lxml")
-        all_links = [each.get("href") for each in soup.select(".job-tile-title > a")]
-        return all_links
-
-    def get_job_and_client_activity(self, detail_page_html):
-        """"
-            Get the job activity and client activity html section from the detail page passed
-        """
-        soup = BeautifulSoup(detail_page_html, 'html.parser')
-        job_activity = soup.select_one(
-            "div.col-12.cfe-ui-job-details-content > section.up-card-section.row > div.col-lg-6")
-        client_activity = soup.select_one("div.cfe-ui-job-about-client")
-        exclamation_mark = False
-        if client_activity is None:
-            return self.get_job_and_client_activity(self.retrieve_job_details())
-        try:
-            if job_activity.find("h4").get_text(strip=True) != "Activity on this job":
-                job_activity = soup.select_one("section.up-card-section.row > div:nth-child(2)")
-                preferred_qualifications = (
-                    soup.select_one("section.up-card-section.row > div:nth-child(1) > ul.list-unstyled")).find_all("li")
-                for each in preferred_qualifications:
-                    if each.select_one("span.ml-5 > div.text-danger") is not None:
-                        exclamation_mark = True
-                        break
-        except AttributeError:
-            # If it raises an attribute error, it means the page has not loaded the job activity element into the DOM at time of scraping
-            # Now we will try to retrieve the whole job details element again
-            return self.get_job_and_client_activity(self.retrieve_job_details())
-        return {"job_activity": job_activity, "client_activity": client_activity, "exclamation_mark": exclamation_mark}
+        return extractors.get_job_links(html_page)
 
-    def go_to_next_page(self):
+    @staticmethod
+    def get_all_job_tiles(html_page: str, page_no) -> list:
         """
-            Get the next page link by using a driver to locate the pagination button
-            and clicking on the next page link tag.\n
-            After the new page has been loaded the current url is then returned
+            Scrapes a given html page and returns the link and the tile fields of all job search results items
+            :param html_page: Weblink to the job search result page
+            :param page_no: search list page number from Upwork url
+            :return: Returns list of job tiles in the page
         """
-        try:
-            next_btn = DRIVER.find_element(By.CSS_SELECTOR,
-                                           "ul.up-pagination > li:nth-child(9) > button.up-pagination-item.up-btn.up-btn-link")
-            if next_btn.is_enabled():
-                next_btn.click()
-                time.sleep(self.timeout)
-                return True
-        except ElementClickInterceptedException:
-            pass
-        except ElementNotInteractableException:
-            pass
-        return None
+        print("Retrieving all job links for page {0}...".format(page_no))
+        print("Checking for requirements matches ...")
+
+        return extractors.get_job_tiles(html_page)
+
+    def tile_meets_requirements(self, tile: dict) -> bool:
+        """
+            Check the requirements that can be checked from the job tile on the search result page.
+            A requirement is only failed when the tile shows a value that can not meet it, so a job is never rejected
+            here that would have matched on its detail page.
+        """
+        if tile['proposal_count'] is not None and tile['proposal_count'] not in self.requirements['proposal_count']:
+            return False
+        if tile['payment_verified'] is not None and tile['payment_verified'] != self.requirements['payment_verified']:
+            return False
+        if tile['total_spent_exact'] and tile['total_spent'] < self.requirements['min_amount_spent']:
+            return False
+        # The tile rounds the rating to one decimal place
+        if tile['ratings'] is not None and tile['ratings'] + 0.05 < self.requirements['min_client_ratings']:
+            return False
+        client_profile = self.lookup_client(tile['client_id'])
+        if client_profile is not None and client_profile['rejected']:
+            METRICS.increment("client_cache_rejections")
+            return False
+        return True
+
+    def client_meets_requirements(self, client_fields: dict) -> bool:
+        """
+            Check the requirements on the client, that are the same for every job of the client
+        """
+        return (client_fields['payment_verified'] == self.requirements["payment_verified"]) and (
+                client_fields['hire_rate'] >= self.requirements['min_hire_rate']) and (
+                client_fields['total_spent'] >= self.requirements['min_amount_spent']) and (
+                client_fields['ratings'] >= self.requirements['min_client_ratings'])
+
+    def lookup_client(self, client_id):
+        """
+            :return: The cached profile of the client, with "rejected" set if it fails the requirements, or None if the
+            client is not known
+        """
+        if client_id is None or self.client_cache is None:
+            return None
+        client_profile = self.client_cache.get(client_id)
+        if client_profile is None:
+            return None
+        METRICS.increment("client_cache_hits")
+        return dict(client_profile, rejected=not self.client_meets_requirements(client_profile))
+
+    def login_with_saved_session(self, session_file: str) -> bool:
+        """
+            Log in by loading a session saved after an earlier login, and check with one page load that the session
+            has not expired.
+        :param session_file: Path to the saved session
+        :return: True if the browser is logged in
+        """
+        if not load_session(self.driver, session_file, UPWORK_BASE_URL):
+            return False
+        print("Restoring saved Upwork session ...")
+        self.driver.get(UPWORK_FIND_WORK_URL)
+        if UPWORK_FIND_WORK_URL in self.driver.current_url:
+            return True
+        print("Saved session has expired")
+        return False
+
+    def save_session(self, session_file: str):
+        save_session(self.driver, session_file)
 
     def login_into_upwork(self, username: str, pswd: str, secret_ans=None):
         """
@@ -226,57 +264,62 @@ class UpworkBot:
         success = False
         if username and pswd:
             print("Logging into Upwork ... ")
-            DRIVER.get(UPWORK_LOGIN_PATH)
+            self.driver.get(UPWORK_LOGIN_PATH)
             try:
-                WebDriverWait(DRIVER, self.timeout).until(EC.presence_of_element_located((By.ID, "login_username")))
-                username_input = DRIVER.find_element(By.ID, "login_username")
+                self.waits.element("login_username", (By.ID, "login_username"))
+                username_input = self.driver.find_element(By.ID, "login_username")
                 username_input.send_keys(username)
 
-                login_btn = DRIVER.find_element(By.ID, "login_password_continue")
+                login_btn = self.driver.find_element(By.ID, "login_password_continue")
                 login_btn.click()
 
-                time.sleep(5)
-                WebDriverWait(DRIVER, self.timeout).until(EC.presence_of_element_located((By.ID, "login_password")))
+                self.waits.element("login_password", (By.ID, "login_password"))
 
-                password_input = DRIVER.find_element(By.ID, "login_password")
+                password_input = self.driver.find_element(By.ID, "login_password")
+                # The password field stays hidden when no account has the username, typing in it then raises
+                # ElementNotInteractableException
+                try:
+                    self.waits.until("login_password_shown", EC.visibility_of(password_input))
+                except TimeoutException:
+                    pass
                 password_input.send_keys(pswd)
 
-                proceed_btn = DRIVER.find_element(By.ID, "login_control_continue")
+                proceed_btn = self.driver.find_element(By.ID, "login_control_continue")
                 proceed_btn.click()
 
                 print("Verifying Login Credentials ...")
-                time.sleep(5)
+                # Upwork either logs the user in or asks the secret question
                 try:
-                    WebDriverWait(DRIVER, self.timeout).until(EC.presence_of_element_located((By.ID, "login_answer")))
-                    ans = DRIVER.find_element(By.ID, "login_answer")
+                    self.waits.until("login_redirect", EC.any_of(EC.url_contains(UPWORK_FIND_WORK_URL),
+                                                                 EC.element_to_be_clickable((By.ID, "login_answer"))))
+                except TimeoutException:
+                    pass
+                if UPWORK_FIND_WORK_URL not in self.driver.current_url and \
+                        self.driver.find_elements(By.ID, "login_answer"):
+                    ans = self.driver.find_element(By.ID, "login_answer")
                     ans.send_keys(secret_ans)
 
-                    proceed_button = DRIVER.find_element(By.ID, "login_control_continue")
+                    proceed_button = self.driver.find_element(By.ID, "login_control_continue")
                     proceed_button.click()
-                except TimeoutException:
-                    pass
+                    try:
+                        self.waits.url_contains("login_redirect", UPWORK_FIND_WORK_URL)
+                    except TimeoutException:
+                        pass
                 # To be sure that the user was logged in successful, we check if the current url is not the same as the
                 # verification url.
-                time.sleep(self.timeout)
-                if "https://www.upwork.com/nx/find-work/" in DRIVER.current_url:
+                if UPWORK_FIND_WORK_URL in self.driver.current_url:
                     success, error_msg = True, None
+                elif self.driver.find_elements(By.ID, "login_answer"):
+                    error_msg = "Incorrect Secret Answer"
                 else:
-                    try:
-                        WebDriverWait(DRIVER, self.timeout).until(
-                            EC.presence_of_element_located((By.ID, "login_answer")))
-                        error_msg = "Incorrect Secret Answer"
-                    except TimeoutException:
-                        if "https://www.upwork.com/nx/find-work/" in DRIVER.current_url:
-                            success, error_msg = True, None
-                        else:
-                            error_msg = "Time Out!. {0} took too long to load after {1}secs".format(DRIVER.current_url,
-                                                                                                    self.timeout)
+                    error_msg = "Time Out!. {0} took too long to load after {1}secs".format(self.driver.current_url,
+                                                                                            self.timeout)
             except NoSuchElementException:
                 error_msg = "Invalid password!"
             except ElementNotInteractableException:
                 error_msg = "No account was found for {0}\nUsername is Invalid!!".format(username)
             except TimeoutException:
-                error_msg = "Time Out!. {0} took too long to load after {1}secs".format(DRIVER.current_url,
+                error_msg = "Time Out!. {0} took too long to load after {1}secs".format(self.driver.current_url,
                                                                                         self.timeout)
         else:
             error_msg = "Please pass login credentials"
@@ -286,22 +329,44 @@ class UpworkBot:
 
         return success
 
-    def retrieve_job_details(self):
+    def retrieve_job_details(self, job_url=None):
 
         """
             Scrap the current webpage (must be a job detail page) and return the section that contains the details about
             a job.
+            In the "http" fetch mode the whole job detail page is fetched from the job_url instead.
+            With an extraction engine that has a script, the script is run in the page until it returns the job fields.
         :return: html content
         """
+        if self.fetch_mode == "http":
+            with METRICS.timer("detail_fetch"):
+                return self.http_fetcher.get(job_url)
+        if self.extraction_engine.script is not None:
+            try:
+                return self.waits.until("job_fields", lambda driver: driver.execute_script(
+                    self.extraction_engine.script, *self.extraction_engine.script_args))
+            except TimeoutException:
+                METRICS.increment("timeouts")
+                print("Time Out! Webpage too long to load after {0} secs.".format(self.timeout))
+                return None
         try:
             # Make sure all element has been loaded to the page before taking action
-            WebDriverWait(DRIVER, self.timeout).until(
-                EC.presence_of_all_elements_located((By.CLASS_NAME, "job-details-loader")))
-            detail_page = DRIVER.find_element(By.CLASS_NAME, "job-details-loader").get_attribute("innerHTML")
+            self.waits.element("job_details", (By.CLASS_NAME, "job-details-loader"))
+            with METRICS.timer("detail_transfer"):
+                detail_page = self.read_detail_page()
         except StaleElementReferenceException:
-            time.sleep(5)
-            detail_page = DRIVER.find_element(By.CLASS_NAME, "job-details-loader").get_attribute("innerHTML")
+            # The section has been rendered again since it was found, read it as soon as it is back
+            METRICS.increment("stale_elements")
+            try:
+                detail_page = self.waits.until("job_details_rerender", lambda driver: self.read_detail_page(),
+                                               ignored_exceptions=(StaleElementReferenceException,
+                                                                   NoSuchElementException))
+            except TimeoutException:
+                METRICS.increment("timeouts")
+                print("Time Out! Webpage too long to load after {0} secs.".format(self.timeout))
+                return None
         except TimeoutException:
+            METRICS.increment("timeouts")
             print("Time Out! Webpage too long to load after {0} secs.".format(self.timeout))
             return None
         except NoSuchElementException:
@@ -309,6 +374,15 @@ class UpworkBot:
             return None
         return detail_page
 
+    def read_detail_page(self) -> str:
+        """
+            :return: The html of the job details section of the loaded page, or of the whole page if the extraction
+            engine needs it
+        """
+        if self.extraction_engine.whole_page:
+            return self.driver.page_source
+        return self.driver.find_element(By.CLASS_NAME, "job-details-loader").get_attribute("innerHTML")
+
     def get_job_required_details(self, job_url=None) -> dict:
         """
         Get the details of job from the detail page and specify if the following requirements are met.\n
@@ -331,137 +405,324 @@ class UpworkBot:
 
         :param job_url: Link to job details
         :return: Returns a dict that contains information which tells if the details of the job search matches requirement and also the job search details information.
+        None if the page has not loaded, the job is then retried by the caller.
         """
 
-        detail_page_html = self.retrieve_job_details()
-        # Check if max number of trials has not been exceeded
-        if self.trial_count >= MAX_REQUEST_TRIAL:
-            print("Unresponsive job detail page. Please check Connection and Try again")
-            raise TimeoutError
-
-        # Reload the scraped details html_page again
+        detail_page_html = self.retrieve_job_details(job_url)
         if detail_page_html is None:
-            self.trial_count += 1
-            return self.get_job_required_details(job_url)
-
-        soup = BeautifulSoup(detail_page_html, 'html.parser')
-
-        job_name = soup.select_one("h1").get_text(strip=True)  # Job name
-        job_link = job_url
+            return None
 
-        activities = self.get_job_and_client_activity(detail_page_html)
-        job_activity = activities['job_activity']
-        client_activity = activities["client_activity"]
+        job_fields = self.extraction_engine.extract(detail_page_html)
 
-        exclamation_mark = activities['exclamation_mark']
+        # The page has not loaded the job and client activity into the DOM yet
+        if job_fields is None:
+            return None
 
-        proposal_count = self.get_proposal_count(job_activity)
-        interviewing_count_and_invite_count = self.get_no_of_interviewing_and_invites(job_activity)
-        interviewing_no = interviewing_count_and_invite_count['interviewing_no']
-        invites_count = interviewing_count_and_invite_count['invites_count']
-        hired_count = self.get_no_hires(job_activity)
+        return self.get_job_details(job_url, job_fields)
 
-        payment_verified = self.get_payment_verification(client_activity)
-        total_spent = self.get_total_amount_spent(client_activity)
-        ratings = self.get_employer_ratings(client_activity)
-        hire_rate = self.get_hire_rate(soup, client_activity, self.get_total_hire_count(client_activity))
+    def meets_requirements(self, job_fields: dict) -> bool:
+        """
+            Check the job fields read from a job detail page against the requirements
+        """
+        proposal_count = job_fields['proposal_count']
+        exclamation_mark = job_fields['exclamation_mark']
+        interviewing_no = job_fields['no_interviewing']
+        invites_count = job_fields['invites_count']
+        hired_count = job_fields['hired_count']
 
         match = False
 
-        if (proposal_count in self.requirements['proposal_count']) and (
-                payment_verified == self.requirements["payment_verified"]) and \
+        if (proposal_count in self.requirements['proposal_count']) and \
                 (exclamation_mark == self.requirements["exclamation_mark"]) and (
                 interviewing_no <= self.requirements['interviewing_no']) and \
                 (invites_count <= self.requirements['invites_count']) and (
                 hired_count <= self.requirements['no_of_job_hires']) and \
-                (hire_rate >= self.requirements['min_hire_rate']) and (
-                total_spent >= self.requirements['min_amount_spent']) and \
-                (ratings >= self.requirements['min_client_ratings']):
+                self.client_meets_requirements(job_fields):
             match = True
+        return match
 
-        details = {
-            "match": match, "job_name": job_name, "job_link": job_link, "proposal_count": proposal_count,
-            "payment_verified": payment_verified, "exclamation_mark": exclamation_mark,
-            "no_interviewing": interviewing_no, "invites_count": invites_count, "hired_count": hired_count,
-            "total_spent": total_spent, "ratings": ratings, "hire_rate": hire_rate
-        }
+    def get_job_required_details_with_retries(self, job_url=None):
+        """
+            Get the details of the job of the current page, reading the page again after a backoff while it has not
+            loaded
+            :return: The job details, or None if the page did not load after MAX_REQUEST_TRIAL trials
+        """
+        for trial in range(1, MAX_REQUEST_TRIAL + 1):
+            time.sleep(self.circuit_breaker.wait_time())
+            job_details = self.get_job_required_details(job_url)
+            self.circuit_breaker.record(job_details is not None)
+            if job_details is not None:
+                return job_details
+            if trial < MAX_REQUEST_TRIAL:
+                METRICS.increment("retries")
+                time.sleep(backoff_delay(trial, RETRY_BASE_DELAY, RETRY_MAX_DELAY))
+        METRICS.increment("jobs_given_up")
+        print("Unresponsive job detail page after {0} trials, skipping it".format(MAX_REQUEST_TRIAL))
+        return None
+
+    def get_job_details(self, job_url: str, job_fields: dict) -> dict:
+        """
+            :return: The job details saved for a job: if it matches the requirements, its link and its fields
+        """
+        with METRICS.timer("requirements"):
+            match = self.meets_requirements(job_fields)
+        details = {"match": match, "job_name": job_fields['job_name'], "job_link": job_url}
+        details.update(job_fields)
+        tile_client_id = self.tile_client_ids.pop(job_url, None)
+        if details.get('client_id') is None:
+            details['client_id'] = tile_client_id
+        if self.client_cache is not None:
+            self.client_cache.add(details)  # Keep the latest statistics of the client
         return details
 
-    def get_all_jobs_that_meets_requirements(self, no_of_jobs: int):
+    def record_job_match(self, job_details: dict) -> bool:
+        """
+            Append the evaluated job to the job store and keep it if it meets the requirements and has not been kept
+            before.
+            :return: True if the job was kept as a match
+        """
+        with METRICS.timer("store_append"):
+            self.job_store.append(job_details)
+            self.seen_jobs.add(job_details)
+        job_link = job_details['job_link']
+        if job_details['match'] and (job_link not in self.matched_job_links):  # Avoid duplicates
+            self.matched_jobs_details.append(job_details)
+            self.matched_job_links.append(job_link)
+            if self.match_counter is not None:
+                with self.match_counter.get_lock():
+                    self.match_counter.value += 1
+            return True
+        return False
+
+    def remember_tile_client(self, job_link: str, tile: dict):
+        """
+            Keep the client id of a job read from its search result page, to save the statistics read from its detail
+            page to the client cache when the detail page does not identify the client
+        """
+        if tile['client_id'] is not None:
+            self.tile_client_ids[job_link] = tile['client_id']
 
+    def record_prefiltered_job(self, job_link: str, tile: dict):
         """
-            Return the first 50 jobs posting that matches a set of pre-defined requirements
-            :param no_of_jobs: No of matching jobs to be retrieved.
+            Append a job whose search result tile fails the requirements to the job store, with the job fields shown
+            on its tile and the others left to None, so that it can be filtered again offline. It is not marked as
+            seen: its tile is checked again on the next run.
+        """
+        self.prefiltered_count += 1
+        job_details = dict({field: None for field in extractors.JOB_FIELDS + extractors.CLIENT_FIELDS},
+                           match=False, job_name=None, job_link=job_link, client_id=None, prefiltered=True,
+                           proposal_count=tile['proposal_count'], payment_verified=tile['payment_verified'],
+                           total_spent=tile['total_spent'] if tile['total_spent_exact'] else None)
+        with METRICS.timer("store_append"):
+            self.job_store.append(job_details)
+
+    def evaluate_job_links(self, job_links: list, max_matches: int) -> list:
+        """
+            Load each job detail page directly by its link and get its details.
+            :param job_links: Links to the job detail pages
+            :param max_matches: Stop once this number of matching jobs has been found
+            :return: List of the job details, in the same order as the job links. A job whose page does not load is
+            put back to be loaded after the other jobs, and is left out once it has been tried MAX_REQUEST_TRIAL times
         """
+        retry_queue = self.create_retry_queue(job_links)
+        all_details = {}
+        no_of_matches = 0
+        while no_of_matches < max_matches:
+            next_job = retry_queue.get()
+            if next_job is None:
+                break
+            (index, job_link), trial = next_job
+            job_details = self.load_job_details(job_link)
+            retry_queue.done((index, job_link), trial, job_details is not None)
+            if job_details is not None:
+                all_details[index] = job_details
+                if job_details['match']:
+                    no_of_matches += 1
+        return [all_details[index] for index in sorted(all_details)]
+
+    def load_job_details(self, job_link: str):
+        """
+            Load a job detail page by its link and get its details
+            :return: The job details, or None if the page did not load
+        """
+        if self.fetch_mode == "browser":
+            self.driver.get(job_link)
+        return self.get_job_required_details(job_link)
 
-        page_no = 1
-        # Navigates to the webpage link given
-        try:
-            DRIVER.get(self.search_url)
-        except TimeoutException:
-            print("Webpage too long to load")
-            return
-        while len(self.matched_job_links) != no_of_jobs:
+    def create_retry_queue(self, job_links: list) -> RetryQueue:
+        """
+            :return: Queue of the (index, job link) of the job links, where a job whose page did not load is put back
+            to be loaded again after a backoff
+        """
+        return RetryQueue(list(enumerate(job_links)), MAX_REQUEST_TRIAL, self.circuit_breaker, RETRY_BASE_DELAY,
+                          RETRY_MAX_DELAY)
+
+    def load_search_page(self, page_no: int):
+        """
+            Load a page of the job search result by its link
+            :return: The html of the search result page, or None if it could not be loaded
+        """
+        page_url = get_search_page_url(self.search_url, page_no)
+        with METRICS.timer("search_page_load"):
+            if self.fetch_mode == "http":
+                return self.http_fetcher.get(page_url)
+            try:
+                self.driver.get(page_url)
+            except TimeoutException:
+                METRICS.increment("timeouts")
+                print("Time Out! Webpage too long to load after {0} secs.".format(self.timeout))
+                return None
+            # The job tiles are rendered after the page has loaded, a page without any job goes quiet instead
+            try:
+                self.waits.until("search_results", EC.any_of(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, extractors.SELECTOR_CSS["job_links"])),
+                    NetworkIdle()))
+            except TimeoutException:
+                pass
+            return self.driver.page_source
 
-            all_jobs = DRIVER.find_elements(By.CSS_SELECTOR, ".job-tile-title > .up-n-link")
-            page_jobs_links = self.get_all_job_posting_links(DRIVER.page_source, page_no)
-            index = 0
+    def select_job_links(self, page_jobs_tiles: list) -> list:
+        """
+            Get the full links of the jobs of a search result page that have to be evaluated: the jobs not evaluated
+            recently and whose tile meets the requirements
+        """
+        job_links = []
+        no_seen_jobs = 0
+        for each in page_jobs_tiles:
+            job_link = self.base_url + each['job_link']
+            if self.seen_jobs.is_fresh(job_link):
+                no_seen_jobs += 1
+            elif not self.tile_meets_requirements(each):
+                self.record_prefiltered_job(job_link, each)
+            else:
+                self.remember_tile_client(job_link, each)
+                job_links.append(job_link)
+        if no_seen_jobs:
+            print("Skipping {0} jobs already evaluated".format(no_seen_jobs))
+        return job_links
+
+    def get_match_count(self) -> int:
+        """
+            :return: Number of matching jobs found, by all the shards of the crawl when it is sharded
+        """
+        if self.match_counter is not None:
+            return self.match_counter.value
+        return len(self.matched_job_links)
+
+    def crawl_search_pages(self, no_of_jobs: int, driver_pool=None, first_page: int = 1, last_page: int = None):
+        """
+            Evaluate the jobs of each search result page until the number of matching jobs or the last page is
+            reached. The pages are loaded by their link.
+            :param first_page: Number of the first search result page to evaluate
+            :param last_page: Number of the last search result page to evaluate, None to go to the end of the search
+            :return: The number of the last page of the search if it has been reached, else None
+        """
+        page_no = first_page
+        previous_page_links = None
+        while self.get_match_count() < no_of_jobs and (last_page is None or page_no <= last_page):
+
+            page_source = self.load_search_page(page_no)
+            if page_source is None:
+                return None
+            page_jobs_tiles = self.get_all_job_tiles(page_source, page_no)
+            page_jobs_links = [each['job_link'] for each in page_jobs_tiles]
+            # The last page has been passed when a page has no jobs or the same jobs as the previous page
+            if not page_jobs_links or page_jobs_links == previous_page_links:
+                return page_no - 1
             no_page_match = 0
 
-            for each in all_jobs:
-                each_job_link = UPWORK_BASE_URL + page_jobs_links[index]
-                print(each_job_link)
-                try:
-                    WebDriverWait(DRIVER, self.timeout).until(EC.element_to_be_clickable(each)).click()
-                except ElementClickInterceptedException:
-                    DRIVER.execute_script(
-                        "arguments[0].click();",
-                        WebDriverWait(DRIVER, self.timeout).until(EC.element_to_be_clickable(each))
-                    )
-                except StaleElementReferenceException:
-                    print("The given URL does not seems to be a valid Upwork Job search result URL\n")
-                    return []
-                try:
-                    job_details = self.get_job_required_details(each_job_link)
+            if driver_pool is not None or self.navigate_by_url or self.fetch_mode == "http":
+                job_links = self.select_job_links(page_jobs_tiles)
+                if driver_pool is not None and self.fetch_mode == "browser":
+                    page_jobs_details = driver_pool.evaluate(job_links, no_of_jobs - self.get_match_count())
+                else:
+                    page_jobs_details = self.evaluate_job_links(job_links, no_of_jobs - self.get_match_count())
+                for job_details in page_jobs_details:
+                    print(job_details['job_link'])
+                    if self.get_match_count() >= no_of_jobs:
+                        break
+                    if self.record_job_match(job_details):
+                        no_page_match += 1
+            else:
+                all_jobs = self.driver.find_elements(By.CSS_SELECTOR, ".job-tile-title > .up-n-link")
+                index = 0
+
+                for each in all_jobs:
+                    each_job_link = self.base_url + page_jobs_links[index]
+                    if self.seen_jobs.is_fresh(each_job_link):
+                        index += 1
+                        continue
+                    if not self.tile_meets_requirements(page_jobs_tiles[index]):
+                        self.record_prefiltered_job(each_job_link, page_jobs_tiles[index])
+                        index += 1
+                        continue
+                    self.remember_tile_client(each_job_link, page_jobs_tiles[index])
+                    print(each_job_link)
+                    try:
+                        self.waits.clickable("job_link", each).click()
+                    except ElementClickInterceptedException:
+                        self.driver.execute_script("arguments[0].click();", self.waits.clickable("job_link", each))
+                    except StaleElementReferenceException:
+                        print("The given URL does not seems to be a valid Upwork Job search result URL\n")
+                        return None
+                    job_details = self.get_job_required_details_with_retries(each_job_link)
                     index += 1  # page number
-                    if len(self.matched_job_links) == no_of_jobs:
+                    if self.get_match_count() >= no_of_jobs:
                         break
-                    if job_details['match'] and (each_job_link not in self.matched_job_links):  # Avoid duplicates
-                        self.matched_jobs_details.append(job_details)
-                        self.matched_job_links.append(each_job_link)
+                    if job_details is not None and self.record_job_match(job_details):
                         no_page_match += 1
-                        self.save_job_results()
 
-                    DRIVER.back()  # Go back to the previous page
-                except TimeoutError:
-                    return []
+                    self.driver.back()  # Go back to the previous page
 
-            if self.go_to_next_page() is None:
-                break
-            page_no += 1
             print("Found {0} jobs that meets requirements\n".format(no_page_match))
+            previous_page_links = page_jobs_links
+            page_no += 1
+        return None
+
+    def get_all_jobs_that_meets_requirements(self, no_of_jobs: int, driver_pool=None, crawler=None):
+
+        """
+            Return the first 50 jobs posting that matches a set of pre-defined requirements
+            :param no_of_jobs: No of matching jobs to be retrieved.
+            :param driver_pool: Optional started DriverPool used to evaluate the job detail pages in parallel
+            :param crawler: Optional CrawlPipeline or ShardedCrawl that runs the crawl instead of crawl_search_pages
+        """
+
+        self.seen_jobs = SeenJobIndex(self.seen_jobs_file, self.seen_job_ttl)
+        self.client_cache = ClientCache(self.client_cache_file, self.client_cache_ttl, self.client_cache_size)
+        try:
+            if crawler is not None:
+                crawler.crawl(self, no_of_jobs, driver_pool)
+            else:
+                self.crawl_search_pages(no_of_jobs, driver_pool)
+        finally:
+            self.seen_jobs.close()
+            self.client_cache.close()
+            self.job_store.close()
+            self.save_job_results(no_of_jobs)
         print("\n\nScrapping completed!!")
 
-        print("No of matched jobs: {0}\n".format(len(self.matched_job_links)))
-        if len(self.matched_job_links) == 0:
+        print("No of matched jobs found in this run: {0}".format(len(self.matched_job_links)))
+        print("Job detail pages not loaded thanks to the search result pre-filter: {0}\n".format(
+            self.prefiltered_count))
+        if len(self.exported_jobs) == 0:
             print("Unable to find jobs that meets requirements")
         else:
-            print("Links to {0} matched jobs has been saved to match_jobs.txt".format(len(self.matched_job_links)))
-            print("Details of matched jobs has been saved to match_jobs.json")
+            print("Links to {0} matched jobs has been saved to {1}".format(len(self.exported_jobs),
+                                                                           self.matched_jobs_txt))
+            if self.need_json_format:
+                print("Details of matched jobs has been saved to {0}".format(self.matched_jobs_json))
         return
 
-    def save_job_results(self):
-        self.save_txt_format()
-        if self.need_json_format:
-            self.save_json_format()
-
-    def save_txt_format(self):
-        with open("matched_jobs.txt", mode="w") as fp:
-            for each in self.matched_job_links:
-                fp.write(each)
-                fp.write("\n")
-
-    def save_json_format(self):
-        with open("matched_jobs.json", mode="w") as fp:
-            json.dump(self.matched_jobs_details, fp, indent=4)
-            fp.write('\n')
\ No newline at end of file
+    def save_job_results(self, max_jobs: int = None) -> list:
+        """
+            Export the jobs matched during this run to the .txt file and, if needed, the .json file. The jobs of the
+            earlier runs and of the other searches stay in the job store only.
+            :param max_jobs: Export at most this number of jobs, the first ones found. The concurrent crawls can find
+            a few more matches than they were asked for before they stop.
+            :return: List of the exported jobs details
+        """
+        with METRICS.timer("save_job_results"):
+            self.exported_jobs = export_matches(self.matched_jobs_details[:max_jobs], self.need_json_format,
+                                                self.matched_jobs_txt, self.matched_jobs_json)
+        return self.exported_jobs
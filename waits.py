@@ -0,0 +1,79 @@
+import time
+
+from selenium.common import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.wait import WebDriverWait
+
+from metrics import METRICS
+
+"""
+    Waits on the browser until a page is ready, instead of sleeping for a fixed time.
+
+    Every wait has a name, used to give it its own timeout and to record the time it took in the "wait.<name>" stage
+    of the metrics, and ends as soon as its condition is met: a change of URL, an element that appears, or the network
+    going idle.
+"""
+
+POLL_FREQUENCY = 0.1  # Seconds between two checks of a condition
+
+# Number of resources the page has loaded, and whether the page has finished loading
+NETWORK_ACTIVITY_SCRIPT = """
+return [performance.getEntriesByType("resource").length, document.readyState === "complete"];
+"""
+
+
+class NetworkIdle:
+    """
+        Condition met once the page has finished loading and has not loaded any resource for quiet_time seconds
+    """
+
+    def __init__(self, quiet_time: float = 0.5):
+        self.quiet_time = quiet_time
+        self.resource_count = None
+        self.quiet_since = None
+
+    def __call__(self, driver):
+        resource_count, complete = driver.execute_script(NETWORK_ACTIVITY_SCRIPT)
+        now = time.monotonic()
+        if not complete or resource_count != self.resource_count:
+            self.resource_count = resource_count
+            self.quiet_since = now
+            return False
+        return now - self.quiet_since >= self.quiet_time
+
+
+class PageWaits:
+    def __init__(self, driver, default_timeout: float, timeouts: dict = None):
+        """
+        :param default_timeout: Seconds before a wait without its own timeout fails
+        :param timeouts: Wait name -> seconds before the wait fails
+        """
+        self.driver = driver
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+
+    def until(self, name: str, condition, ignored_exceptions=None):
+        """
+            Wait until the condition returns a true value
+            :return: The value returned by the condition
+            :raise TimeoutException: If the condition is not met before the timeout of the wait
+        """
+        timeout = self.timeouts.get(name, self.default_timeout)
+        with METRICS.timer("wait." + name):
+            try:
+                return WebDriverWait(self.driver, timeout, POLL_FREQUENCY, ignored_exceptions).until(condition)
+            except TimeoutException:
+                METRICS.increment("wait_timeouts." + name)
+                raise
+
+    def element(self, name: str, locator: tuple):
+        return self.until(name, EC.presence_of_element_located(locator))
+
+    def clickable(self, name: str, locator_or_element):
+        return self.until(name, EC.element_to_be_clickable(locator_or_element))
+
+    def url_contains(self, name: str, url: str):
+        return self.until(name, EC.url_contains(url))
+
+    def network_idle(self, name: str = "network_idle", quiet_time: float = 0.5):
+        return self.until(name, NetworkIdle(quiet_time))
@@ -0,0 +1,123 @@
+import time
+
+from client_cache import ClientCache
+from extractors import get_job_id
+from seen_jobs import SeenJobIndex
+from upwork import UpworkBot, set_url_params
+
+"""
+    Watch mode: keep polling job searches for newly posted jobs.
+
+    Each search is loaded sorted by newest first. A poll stops reading search result pages as soon as it reaches a job
+    it has already handled, so a poll usually costs a single page load. Matches are printed and exported as soon as
+    they are found, with the time between the posting of the job and its detection.
+"""
+
+
+class SearchWatcher:
+    def __init__(self, bot: UpworkBot, search_urls: list, poll_interval: float = 300, max_pages: int = 5,
+                 on_match=None):
+        """
+        :param bot: Logged-in UpworkBot
+        :param search_urls: Links to the job searches to watch
+        :param poll_interval: Seconds between the start of two polls of all the searches
+        :param max_pages: Maximum number of search result pages read in one poll of a search
+        :param on_match: Optional function called with the details of every new matching job
+        """
+        self.bot = bot
+        self.search_urls = search_urls
+        self.poll_interval = poll_interval
+        self.max_pages = max_pages
+        self.on_match = on_match
+        self.newest_job_ids = {}  # Search link -> id of the newest job seen in the search
+        self.detection_times = []
+
+    def get_new_tiles(self, search_url: str) -> list:
+        """
+            Read the search result pages, newest jobs first, until a job that has already been handled
+            :return: Tiles of the jobs posted since the last poll
+        """
+        self.bot.search_url = set_url_params(search_url, sort="recency")
+        newest_job_id = self.newest_job_ids.get(search_url)
+        new_tiles = []
+        for page_no in range(1, self.max_pages + 1):
+            page_source = self.bot.load_search_page(page_no)
+            if page_source is None:
+                break
+            page_jobs_tiles = self.bot.get_all_job_tiles(page_source, page_no)
+            if page_no == 1 and page_jobs_tiles:
+                self.newest_job_ids[search_url] = get_job_id(page_jobs_tiles[0]['job_link'])
+            reached_handled_job = False
+            for tile in page_jobs_tiles:
+                if get_job_id(tile['job_link']) == newest_job_id or \
+                        self.bot.seen_jobs.is_fresh(self.bot.base_url + tile['job_link']):
+                    reached_handled_job = True
+                    break
+                new_tiles.append(tile)
+            if reached_handled_job or not page_jobs_tiles:
+                break
+        return new_tiles
+
+    def poll(self, search_url: str) -> list:
+        """
+            Evaluate the jobs posted in a search since the last poll
+            :return: Details of the new matching jobs
+        """
+        new_tiles = self.get_new_tiles(search_url)
+        posted_times = {self.bot.base_url + tile['job_link']: tile['posted_at'] for tile in new_tiles}
+        new_matches = []
+        for job_link in self.bot.select_job_links(new_tiles):
+            evaluated = self.bot.evaluate_job_links([job_link], 1)
+            if not evaluated:  # The page did not load after all its trials
+                continue
+            job_details = evaluated[0]
+            job_details['posted_at'] = posted_times[job_link]
+            if self.bot.record_job_match(job_details):
+                new_matches.append(job_details)
+                self.emit(job_details)
+        if new_matches:
+            self.bot.save_job_results()
+        return new_matches
+
+    def emit(self, job_details: dict):
+        detected_at = time.time()
+        if job_details['posted_at'] is not None:
+            detection_time = detected_at - job_details['posted_at']
+            self.detection_times.append(detection_time)
+            print("New match, detected {0:.0f} minutes after posting: {1}".format(detection_time / 60,
+                                                                                 job_details['job_link']))
+        else:
+            print("New match: {0}".format(job_details['job_link']))
+        if self.on_match is not None:
+            self.on_match(job_details)
+
+    def print_detection_times(self):
+        if self.detection_times:
+            print("Time from posting to detection: average {0:.0f} minutes, longest {1:.0f} minutes".format(
+                sum(self.detection_times) / len(self.detection_times) / 60, max(self.detection_times) / 60))
+
+    def watch(self):
+        """
+            Poll all the searches every poll_interval seconds until the user stops the bot with Ctrl+C
+        """
+        self.bot.seen_jobs = SeenJobIndex(self.bot.seen_jobs_file, self.bot.seen_job_ttl)
+        self.bot.client_cache = ClientCache(self.bot.client_cache_file, self.bot.client_cache_ttl,
+                                            self.bot.client_cache_size)
+        print("Watching {0} searches for new jobs. Press Ctrl+C to stop\n".format(len(self.search_urls)))
+        try:
+            while True:
+                poll_started = time.time()
+                for search_url in self.search_urls:
+                    self.poll(search_url)
+                self.print_detection_times()
+                time.sleep(max(0, self.poll_interval - (time.time() - poll_started)))
+        except KeyboardInterrupt:
+            print("\nWatch stopped")
+        finally:
+            self.bot.seen_jobs.close()
+            self.bot.client_cache.close()
+            self.bot.job_store.close()
+            self.bot.save_job_results()
+        print("No of matched jobs found while watching: {0}, {1} saved to {2}".format(
+            len(self.bot.matched_job_links), len(self.bot.exported_jobs), self.bot.matched_jobs_txt))
+        self.print_detection_times()